@@ -0,0 +1,108 @@
+"""Benchmark for the compressed consultation text columns.
+
+Builds a seeded corpus of consultation rows (transcript, summary JSON and
+segments JSON), then for each method reports the stored size, the size
+reduction and the per-row encode/decode cost, plus a SQLite round trip
+(insert and read back through the CompressedText column type).
+
+Usage:
+    python benchmarks/bench_compression.py [--rows 2000] [--words 1500] [--seed 42]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from sqlalchemy import create_engine, Column, Integer, MetaData, Table, Text, select
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compressed_text import CompressedText, encode_text, decode_text, zstandard_module
+
+WORDS = (
+    'paciente refere dor de cabeça frontal há três semanas com náusea episódica '
+    'sem febre nega trauma recente pressão arterial 120x80 mmHg ausculta pulmonar '
+    'sem alterações sinusite aguda provável paracetamol 750mg de 6 em 6 horas '
+    'tomografia de face retorno em 15 dias doutor bom dia tudo bem então vamos lá'
+).split()
+
+FIELDS = ['transcricao_completa', 'resumo_clinico', 'segmentos_detalhados']
+
+
+def make_corpus(rows, words, seed):
+    """Generate synthetic consultations shaped like the ones the recorder saves"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(rows):
+        segments = []
+        for i in range(rng.randint(5, 30)):
+            text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(words // 40, words // 10)))
+            segments.append({'timestamp': f'00:{i:02d}:00', 'texto': text, 'duracao': 30})
+        summary = {field: ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+                   for field in ('queixa_principal', 'historia_atual', 'exame_fisico',
+                                 'diagnostico', 'prescricoes', 'observacoes')}
+        corpus.append({
+            'transcricao_completa': ' '.join(segment['texto'] for segment in segments),
+            'resumo_clinico': json.dumps(summary, ensure_ascii=False),
+            'segmentos_detalhados': json.dumps(segments, ensure_ascii=False),
+        })
+    return corpus
+
+
+def bench_codec(corpus, method):
+    values = [row[field] for row in corpus for field in FIELDS]
+    start = time.perf_counter()
+    encoded = [encode_text(value, method) for value in values]
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for value in encoded:
+        decode_text(value)
+    decode_time = time.perf_counter() - start
+    return sum(len(value) for value in encoded), encode_time, decode_time
+
+
+def bench_roundtrip(corpus, method):
+    """Insert and read back every row through SQLite; returns (write_s, read_s)"""
+    engine = create_engine('sqlite://')
+    column_type = Text() if method == 'plain' else CompressedText(method)
+    table = Table('consultations', MetaData(), Column('id', Integer, primary_key=True),
+                  *[Column(field, column_type) for field in FIELDS])
+    table.metadata.create_all(engine)
+    with engine.begin() as connection:
+        start = time.perf_counter()
+        connection.execute(table.insert(), corpus)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        connection.execute(select(table)).all()
+        read_time = time.perf_counter() - start
+    return write_time, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=1500, help='approximate transcript length')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.rows, args.words, args.seed)
+    raw_size = sum(len(row[field].encode('utf-8')) for row in corpus for field in FIELDS)
+    print(f"corpus: {args.rows} rows, {raw_size / 1e6:.1f} MB of text")
+
+    methods = ['none', 'zlib'] + (['zstd'] if zstandard_module() else [])
+    print(f"{'method':>6} {'stored MB':>10} {'reduction':>10} {'enc us/row':>11} {'dec us/row':>11} "
+          f"{'db write us/row':>16} {'db read us/row':>15}")
+    plain_write, plain_read = bench_roundtrip(corpus, 'plain')
+    print(f"{'text':>6} {raw_size / 1e6:>10.1f} {0:>9.0%} {0:>11.1f} {0:>11.1f} "
+          f"{plain_write / args.rows * 1e6:>16.1f} {plain_read / args.rows * 1e6:>15.1f}")
+    for method in methods:
+        size, encode_time, decode_time = bench_codec(corpus, method)
+        write_time, read_time = bench_roundtrip(corpus, method)
+        print(f"{method:>6} {size / 1e6:>10.1f} {1 - size / raw_size:>9.0%} "
+              f"{encode_time / args.rows * 1e6:>11.1f} {decode_time / args.rows * 1e6:>11.1f} "
+              f"{write_time / args.rows * 1e6:>16.1f} {read_time / args.rows * 1e6:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
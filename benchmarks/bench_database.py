@@ -0,0 +1,128 @@
+"""Benchmark for database queries at increasing dataset sizes.
+
+Resets the schema, then grows a synthetic dataset (see generate_dataset.py)
+to each requested number of patients and times the queries the app runs:
+CPF lookup (patient cache cleared first), name search, consultation history
+page, full-text search, exam listing and exam deletion. Reports p50/p95/max
+latency per operation and scale.
+
+The target database is wiped. Usage:
+    python benchmarks/bench_database.py [--scales 10000,100000,1000000] [--database-url sqlite:///data/bench/bench.db]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'bench', 'bench.db')
+SEARCH_TERMS = ['sinusite', 'dor lombar', 'amoxicilina', 'hemograma', 'palpitações']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timed(samples, operation):
+    """Run `operation(sample)` for each sample; returns latencies in ms"""
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        operation(sample)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_queries(rng, patients, samples):
+    from sqlalchemy import func
+    from database import (
+        session_scope, get_patient_consultations_page, get_patient_exams_page, search_consultations,
+        delete_exam, Exam
+    )
+    from patient_manager import PatientManager
+    from patient_cache import get_patient_cache
+    from generate_dataset import make_cpf, FIRST_NAMES, SURNAMES
+
+    manager = PatientManager()
+    cache = get_patient_cache()
+    patient_ids = [rng.randint(1, patients) for _ in range(samples)]
+
+    def cpf_lookup(patient_id):
+        cache.clear()
+        assert manager.get_patient_by_cpf(make_cpf(patient_id)) is not None
+
+    def name_search(prefix):
+        manager.search_patients_by_name(prefix)
+
+    def history_page(patient_id):
+        with session_scope() as db:
+            get_patient_consultations_page(db, patient_id)
+
+    def full_text_search(term):
+        with session_scope() as db:
+            search_consultations(db, term)
+
+    def exam_page(patient_id):
+        with session_scope() as db:
+            get_patient_exams_page(db, patient_id)
+
+    def exam_delete(exam_id):
+        with session_scope() as db:
+            delete_exam(db, exam_id)
+
+    names = [rng.choice(FIRST_NAMES)[:rng.randint(3, 5)] + ' ' + rng.choice(SURNAMES)[:rng.randint(2, 4)]
+             for _ in range(samples)]
+    with session_scope() as db:
+        max_exam = db.query(func.max(Exam.id)).scalar() or 0
+    exam_ids = rng.sample(range(1, max_exam + 1), min(samples, max_exam))
+
+    return {
+        'cpf lookup': timed(patient_ids, cpf_lookup),
+        'name search': timed(names, name_search),
+        'history page': timed(patient_ids, history_page),
+        'full-text search': timed([rng.choice(SEARCH_TERMS) for _ in range(samples)], full_text_search),
+        'exam page': timed(patient_ids, exam_page),
+        'exam delete': timed(exam_ids, exam_delete),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10000,100000,1000000', help='comma-separated patient counts')
+    parser.add_argument('--samples', type=int, default=200, help='operations timed per query and scale')
+    parser.add_argument('--consultations-per-patient', type=float, default=3)
+    parser.add_argument('--exams-per-patient', type=float, default=1)
+    parser.add_argument('--transcript-words', type=int, default=600)
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL', DEFAULT_DATABASE_URL))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # database.py reads DATABASE_URL when the engine is first created
+    os.environ['DATABASE_URL'] = args.database_url
+    if args.database_url.startswith('sqlite:///'):
+        os.makedirs(os.path.dirname(os.path.abspath(args.database_url[len('sqlite:///'):])), exist_ok=True)
+    from database import reset_schema
+    from generate_dataset import generate
+
+    reset_schema()
+    rng = random.Random(args.seed)
+    print(f"{'patients':>9} {'operation':>17} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    current = 0
+    for scale in [int(value) for value in args.scales.split(',')]:
+        start = time.perf_counter()
+        generate(scale - current, args.consultations_per_patient, args.exams_per_patient,
+                 args.transcript_words, seed=args.seed + scale, verbose=False)
+        current = scale
+        print(f"{scale:>9} {'generate':>17} {'':>8} {'':>8} {(time.perf_counter() - start) * 1000:>8.0f}")
+        for operation, latencies in run_queries(rng, scale, args.samples).items():
+            if latencies:
+                print(f"{scale:>9} {operation:>17} {statistics.median(latencies):>8.2f} "
+                      f"{percentile(latencies, 0.95):>8.2f} {max(latencies):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Micro-benchmark for MedicalSummarizer._parse_summary.
+
+Compares the compiled single-pass parser against the previous line-by-line
+substring implementation on a seeded corpus of synthetic long LLM outputs and
+checks the parsed sections against the ones the corpus was generated from.
+The corpus includes headers with inline content and body lines that mention a
+section name, which the previous implementation mis-parsed.
+
+Usage:
+    python benchmarks/bench_parser.py [--documents 500] [--lines 200] [--seed 42]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('SUMMARY_CACHE_ENABLED', '0')
+
+from medical_summarizer import MedicalSummarizer
+
+# (header line, section); headers ending in "{}" carry inline content
+HEADERS = [
+    ('Queixa Principal:', 'queixa_principal'), ('1. **Queixa Principal:**', 'queixa_principal'),
+    ('## QUEIXA PRINCIPAL', 'queixa_principal'), ('1. **Queixa Principal:** {}', 'queixa_principal'),
+    ('História Atual:', 'historia_atual'), ('2. **História Atual:**', 'historia_atual'),
+    ('Historia atual', 'historia_atual'), ('**História Atual**: {}', 'historia_atual'),
+    ('Exame Físico (se mencionado):', 'exame_fisico'), ('3. **Exame Físico:**', 'exame_fisico'),
+    ('exame fisico', 'exame_fisico'), ('- Exame Físico: {}', 'exame_fisico'),
+    ('Diagnóstico:', 'diagnostico'), ('4. **Diagnóstico:**', 'diagnostico'),
+    ('**Diagnostico**', 'diagnostico'), ('Diagnóstico: {}', 'diagnostico'),
+    ('Prescrições:', 'prescricoes'), ('5. **Prescrições:**', 'prescricoes'),
+    ('Prescricoes', 'prescricoes'), ('5. Prescrições: {}', 'prescricoes'),
+    ('Observações (se houver):', 'observacoes'), ('6. **Observações:**', 'observacoes'),
+    ('Observacoes', 'observacoes'), ('### Observações: {}', 'observacoes'),
+]
+
+# Body lines naming a section without being its header
+HEADER_WORD_LINES = [
+    'Sem diagnóstico definido', 'Exame físico sem alterações relatadas',
+    'História atual de cefaleia há três semanas', 'aguardar observações do especialista',
+    '- prescrições anteriores mantidas', 'queixa principal não relatada pelo paciente',
+]
+
+WORDS = (
+    'paciente refere dor de cabeça frontal há três semanas com náusea '
+    'episódica sem febre nega trauma recente pressão arterial 120x80 mmHg '
+    'ausculta pulmonar sem alterações sinusite aguda provável paracetamol '
+    '750mg de 6 em 6 horas tomografia de face retorno em 15 dias'
+).split()
+
+
+def legacy_parse_summary(summary_text):
+    """Previous implementation, kept as the speed baseline"""
+    sections = {
+        'queixa_principal': '',
+        'historia_atual': '',
+        'exame_fisico': '',
+        'diagnostico': '',
+        'prescricoes': '',
+        'observacoes': ''
+    }
+    current_section = None
+    for line in summary_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        lower_line = line.lower()
+        if 'queixa principal' in lower_line:
+            current_section = 'queixa_principal'
+            continue
+        elif 'história atual' in lower_line or 'historia atual' in lower_line:
+            current_section = 'historia_atual'
+            continue
+        elif 'exame físico' in lower_line or 'exame fisico' in lower_line:
+            current_section = 'exame_fisico'
+            continue
+        elif 'diagnóstico' in lower_line or 'diagnostico' in lower_line:
+            current_section = 'diagnostico'
+            continue
+        elif 'prescrições' in lower_line or 'prescricoes' in lower_line:
+            current_section = 'prescricoes'
+            continue
+        elif 'observações' in lower_line or 'observacoes' in lower_line:
+            current_section = 'observacoes'
+            continue
+        if current_section and current_section in sections:
+            if sections[current_section]:
+                sections[current_section] += ' '
+            sections[current_section] += line
+    for key in sections:
+        if not sections[key]:
+            sections[key] = 'Não identificado' if key != 'exame_fisico' and key != 'observacoes' else ''
+    return sections
+
+
+def make_corpus(documents, lines_per_document, seed):
+    """Generate synthetic LLM outputs with mixed header styles and long bodies.
+
+    Returns (text, expected sections) pairs.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(documents):
+        lines = ['Resumo estruturado da consulta:', '']
+        sections = {section: [] for _, section in HEADERS}
+        while len(lines) < lines_per_document:
+            header, section = rng.choice(HEADERS)
+            if '{}' in header:
+                content = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 10)))
+                header = header.format(content)
+                sections[section].append(content)
+            lines.append(header)
+            for _ in range(rng.randint(1, 12)):
+                if rng.random() < 0.1:
+                    body = rng.choice(HEADER_WORD_LINES)
+                else:
+                    prefix = rng.choice(['', '- ', '* ', '  '])
+                    body = prefix + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+                lines.append(body)
+                sections[section].append(body.strip())
+            lines.append('')
+        expected = {
+            key: ' '.join(parts) or ('' if key in ('exame_fisico', 'observacoes') else 'Não identificado')
+            for key, parts in sections.items()
+        }
+        corpus.append(('\n'.join(lines), expected))
+    return corpus
+
+
+def bench(parse, corpus, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=500)
+    parser.add_argument('--lines', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    documents = make_corpus(args.documents, args.lines, args.seed)
+    corpus = [text for text, _ in documents]
+    summarizer = MedicalSummarizer(cache=False)
+
+    mismatches = sum(1 for text, expected in documents if summarizer._parse_summary(text) != expected)
+    legacy_mismatches = sum(1 for text, expected in documents if legacy_parse_summary(text) != expected)
+    total_mb = sum(len(text.encode('utf-8')) for text in corpus) / 1e6
+
+    legacy = bench(legacy_parse_summary, corpus, args.repeat)
+    current = bench(summarizer._parse_summary, corpus, args.repeat)
+
+    print(f"corpus: {len(corpus)} documents, {total_mb:.1f} MB")
+    print(f"legacy:   {legacy * 1000:8.1f} ms  {total_mb / legacy:7.1f} MB/s")
+    print(f"compiled: {current * 1000:8.1f} ms  {total_mb / current:7.1f} MB/s")
+    print(f"speedup:  {legacy / current:.2f}x")
+    print(f"mismatches: {mismatches} (legacy: {legacy_mismatches})")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Cold start benchmark for the Streamlit app.
+
+Each run starts a fresh interpreter, so nothing is cached between runs:
+- import profile: `python -X importtime` of src/app.py's imports, reporting
+  the total and the slowest modules app imports directly;
+- time to first render: the first script run of streamlit_app.py under
+  streamlit's AppTest (the login screen), measured from process start,
+  plus which heavy optional modules that run loaded.
+
+Exits with status 1 when the median time to first render exceeds --target-ms,
+so it can guard cold start in CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--target-ms 3000] [--top 15]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Modules that should only load when the feature using them is first used
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'pyaudio', 'requests', 'zstandard']
+
+IMPORT_APP = "import sys; sys.path.insert(0, 'src'); import app"
+FIRST_RENDER = f"""
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({os.path.join(ROOT, 'streamlit_app.py')!r}, default_timeout=120).run()
+print(json.dumps({{
+    'rendered_at': time.time(),
+    'exception': [str(e.value) for e in at.exception],
+    'heavy_modules': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def app_imports(modules):
+    """Modules imported directly by app, slowest first (children are listed before their parent)"""
+    end = max(i for i, module in enumerate(modules) if module[0] == 'app' and module[3] == 0)
+    direct = []
+    for module in reversed(modules[:end]):
+        if module[3] == 0:
+            break
+        if module[3] == 1:
+            direct.append(module)
+    return sorted(direct, key=lambda module: module[2], reverse=True)
+
+
+def run_import_profile(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_APP],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    return parse_importtime(result.stderr)
+
+
+def run_first_render(env):
+    """Return (ms from process start to first render, child report)"""
+    started = time.time()
+    result = subprocess.run([sys.executable, '-c', FIRST_RENDER], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return (report['rendered_at'] - started) * 1000, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest direct imports of app to list')
+    parser.add_argument('--target-ms', type=float, default=None, help='fail above this median time to first render')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db'))
+
+    totals = []
+    for _ in range(args.runs):
+        modules = run_import_profile(env)
+        totals.append(sum(self_us for _, self_us, _, _ in modules) / 1000)
+    print(f"import app: {statistics.median(totals):.0f} ms median over {args.runs} runs "
+          f"({len(modules)} modules)")
+    print(f"{'imported by app':<40} {'cumulative ms':>14}")
+    for name, _, cumulative_us, _ in app_imports(modules)[:args.top]:
+        print(f"{name:<40} {cumulative_us / 1000:>14.1f}")
+
+    renders = []
+    for _ in range(args.runs):
+        elapsed, report = run_first_render(env)
+        renders.append(elapsed)
+        if report['exception']:
+            print(f"render raised: {report['exception']}")
+    median = statistics.median(renders)
+    print(f"time to first render: p50 {median:.0f} ms, max {max(renders):.0f} ms")
+    print(f"heavy modules loaded by first render: {', '.join(report['heavy_modules']) or 'none'}")
+
+    if args.target_ms is not None and median > args.target_ms:
+        print(f"FAIL: above target of {args.target_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
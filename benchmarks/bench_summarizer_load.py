@@ -0,0 +1,107 @@
+"""End-to-end load benchmark for MedicalSummarizer.
+
+Drives MedicalSummarizer.summarize at increasing concurrency against the local
+mock LLM server (or any OpenAI-compatible --url) and reports throughput,
+p50/p95/p99 latency, retries and error rate per level.
+
+Usage:
+    python benchmarks/bench_summarizer_load.py --levels 1,4,16,64 --requests 200
+    python benchmarks/bench_summarizer_load.py --error-429-rate 0.1 --stream
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('SUMMARY_CACHE_ENABLED', '0')
+
+from llm_client import LLMClient
+from medical_summarizer import MedicalSummarizer
+from mock_llm_server import MockLLMConfig, start_server, server_url
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_level(summarizer, concurrency, requests, stream):
+    """Run `requests` summaries with `concurrency` workers and collect metrics"""
+    on_update = (lambda section, content: None) if stream else None
+    summarizer.client.stats.reset()
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            summarizer.summarize(f"Consulta sintética {concurrency}-{i}: paciente com cefaleia.",
+                                 on_update=on_update, raise_errors=True)
+            failed = False
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, failed in results if failed)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'throughput_rps': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'retries': summarizer.client.stats.snapshot()['retries'],
+        'error_rate': errors / requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarizer load benchmark')
+    parser.add_argument('--url', help='existing endpoint; starts the mock server if omitted')
+    parser.add_argument('--levels', default='1,2,4,8,16,32')
+    parser.add_argument('--requests', type=int, default=100, help='requests per level')
+    parser.add_argument('--stream', action='store_true', help='use stream=True responses')
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--tokens-per-second', type=float, default=0)
+    parser.add_argument('--error-429-rate', type=float, default=0.0)
+    parser.add_argument('--error-500-rate', type=float, default=0.0)
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print one JSON line per level')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(',')]
+    url = args.url
+    if not url:
+        config = MockLLMConfig(args.latency, args.tokens_per_second,
+                               args.error_429_rate, args.error_500_rate, retry_after=0.05)
+        url = server_url(start_server(config))
+
+    client = LLMClient(pool_size=max(levels), max_retries=args.max_retries,
+                       backoff_base=0.05, backoff_max=1.0)
+    # The summarizer's in-flight limit would otherwise cap every level at LLM_MAX_CONCURRENCY
+    summarizer = MedicalSummarizer(client=client, cache=False, max_concurrency=max(levels))
+    summarizer.url = url
+
+    if not args.json:
+        print(f"{'conc':>5} {'req':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>7} {'errors':>7}")
+    for level in levels:
+        result = run_level(summarizer, level, args.requests, args.stream)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{result['concurrency']:>5} {result['requests']:>5} {result['throughput_rps']:>8.1f} "
+                  f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                  f"{result['retries']:>7} {result['error_rate']:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
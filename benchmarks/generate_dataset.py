@@ -0,0 +1,238 @@
+"""Fill the database with a seeded synthetic dataset.
+
+Generates patients with valid CPFs and Brazilian names, consultations with
+long transcripts and structured summaries, and exams whose PDFs go to the blob
+store. Rows are written with bulk Core inserts in batches, one transaction per
+batch, and appended after any existing rows. Ids are assigned here (consecutive
+after the current maximum); on PostgreSQL the id sequences are advanced past
+them afterwards so the app's own inserts don't collide.
+
+Usage:
+    DATABASE_URL=sqlite:///data/bench/bench.db python benchmarks/generate_dataset.py --patients 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import func, insert, text
+
+from database import (
+    get_session_factory, init_schema, index_bulk_consultations, exam_blobs, Patient, Consultation, Exam
+)
+from patient_search import normalize_name
+
+FIRST_NAMES = [
+    'João', 'José', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Pedro', 'Lucas', 'Luiz', 'Marcos',
+    'Luís', 'Gabriel', 'Rafael', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo', 'Felipe', 'Raimundo', 'Rodrigo',
+    'Maria', 'Ana', 'Francisca', 'Antônia', 'Adriana', 'Juliana', 'Márcia', 'Fernanda', 'Patrícia', 'Aline',
+    'Sandra', 'Camila', 'Amanda', 'Bruna', 'Jéssica', 'Letícia', 'Júlia', 'Luciana', 'Vanessa', 'Mariana',
+]
+SURNAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+    'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira', 'Araújo', 'Conceição', 'Brandão', 'Magalhães', 'Sá',
+]
+STREETS = ['Rua das Flores', 'Avenida Brasil', 'Rua São João', 'Avenida Paulista', 'Rua XV de Novembro']
+
+COMPLAINTS = [
+    'dor de cabeça frontal', 'tosse seca', 'febre e calafrios', 'dor lombar', 'dor de garganta',
+    'falta de ar aos esforços', 'dor abdominal difusa', 'tontura', 'palpitações', 'zumbido no ouvido',
+]
+DIAGNOSES = [
+    'Sinusite aguda', 'Infecção de vias aéreas superiores', 'Lombalgia mecânica', 'Faringite viral',
+    'Hipertensão arterial sistêmica', 'Gastrite', 'Enxaqueca sem aura', 'Asma leve intermitente',
+]
+PRESCRIPTIONS = [
+    'Dipirona 1 g de 6 em 6 horas se dor ou febre', 'Paracetamol 750 mg de 8 em 8 horas',
+    'Ibuprofeno 400 mg de 8 em 8 horas por 5 dias', 'Amoxicilina 500 mg de 8 em 8 horas por 7 dias',
+    'Losartana 50 mg uma vez ao dia', 'Omeprazol 20 mg em jejum',
+]
+SENTENCES = [
+    'bom dia doutor tudo bem', 'eu não tô me sentindo muito bem já faz uns dias',
+    'começou com {complaint} e foi piorando', 'tem alguma coisa que melhora ou piora a dor',
+    'piora no fim do dia e quando eu faço esforço', 'você tem febre medida no termômetro',
+    'nega alergias medicamentosas', 'vou examinar agora respira fundo por favor',
+    'a pressão está 130 por 85', 'a ausculta pulmonar está sem alterações',
+    'vamos pedir um hemograma completo e um exame de urina', 'qualquer piora pode voltar antes',
+    'vou te passar {prescription}', 'retorno em quinze dias com os resultados dos exames',
+    'tá bom doutor obrigado', 'já tomou algum remédio por conta própria',
+]
+EXAM_TYPES = ['Hemograma completo', 'Glicemia de jejum', 'Raio-X de tórax', 'Urina tipo I', 'Perfil lipídico']
+
+
+def make_cpf(index):
+    """Valid, unique CPF for a sequential index"""
+    digits = [int(d) for d in f'{100000000 + index:09d}'[-9:]]
+    for weight_start in (10, 11):
+        total = sum(d * w for d, w in zip(digits, range(weight_start, 1, -1)))
+        remainder = total % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    return ''.join(map(str, digits))
+
+
+def make_patient(rng, patient_id):
+    nome = f"{rng.choice(FIRST_NAMES)} {' '.join(rng.sample(SURNAMES, rng.choice((1, 2, 2, 3))))}"
+    birth = datetime(1940, 1, 1) + timedelta(days=rng.randrange(30000))
+    return {
+        'id': patient_id,
+        'nome': nome,
+        'nome_normalizado': normalize_name(nome),
+        'cpf': make_cpf(patient_id),
+        'data_nascimento': birth.strftime('%d/%m/%Y'),
+        'sexo': rng.choice(('masculino', 'feminino')),
+        'telefone': f'11{rng.randrange(900000000, 999999999)}',
+        'email': f"{normalize_name(nome).replace(' ', '.')}{patient_id}@exemplo.com.br",
+        'endereco': f'{rng.choice(STREETS)}, {rng.randrange(1, 3000)}',
+    }
+
+
+def make_consultation(rng, consultation_id, patient_id, words, when):
+    complaint = rng.choice(COMPLAINTS)
+    prescription = rng.choice(PRESCRIPTIONS)
+    segments = []
+    total_words = 0
+    while total_words < words:
+        text = ' '.join(
+            rng.choice(SENTENCES).format(complaint=complaint, prescription=prescription)
+            for _ in range(rng.randint(2, 6))
+        )
+        segments.append({'timestamp': when.strftime('%H:%M:%S'), 'texto': text})
+        total_words += len(text.split())
+    summary = {
+        'queixa_principal': complaint.capitalize(),
+        'historia_atual': f'Paciente refere {complaint} há {rng.randint(1, 30)} dias, com piora progressiva.',
+        'exame_fisico': 'PA 130x85 mmHg, ausculta pulmonar sem alterações.',
+        'diagnostico': rng.choice(DIAGNOSES),
+        'prescricoes': prescription,
+        'observacoes': 'Retorno em 15 dias.',
+    }
+    return dict(
+        summary,
+        id=consultation_id,
+        patient_id=patient_id,
+        data_consulta=when,
+        transcricao_completa=' '.join(segment['texto'] for segment in segments),
+        resumo_clinico=json.dumps(summary, ensure_ascii=False),
+        segmentos_detalhados=json.dumps(segments, ensure_ascii=False),
+    )
+
+
+def make_pdf(rng, size):
+    """Minimal PDF-looking payload of about `size` bytes"""
+    body = ' '.join(rng.choice(SENTENCES) for _ in range(size // 30)).encode('utf-8')
+    return b'%PDF-1.4\n' + body[:max(0, size - 20)] + b'\n%%EOF\n'
+
+
+def generate(patients, consultations_per_patient=3, exams_per_patient=1, transcript_words=600,
+             pdf_size=16 * 1024, distinct_pdfs=1000, batch_size=5000, seed=42, verbose=True):
+    """Append the synthetic dataset; returns row counts written"""
+    init_schema()
+    rng = random.Random(seed)
+    db = get_session_factory()()
+    counts = {'patients': 0, 'consultations': 0, 'exams': 0, 'pdfs': 0}
+    started = time.perf_counter()
+    try:
+        next_patient = (db.query(func.max(Patient.id)).scalar() or 0) + 1
+        next_consultation = (db.query(func.max(Consultation.id)).scalar() or 0) + 1
+        next_exam = (db.query(func.max(Exam.id)).scalar() or 0) + 1
+
+        # A pool of distinct PDFs, shared by exams (the blob store deduplicates by content)
+        pdfs = []
+        for i in range(min(distinct_pdfs, max(1, patients * exams_per_patient))):
+            content = make_pdf(rng, pdf_size) + str(i).encode()
+            pdfs.append((exam_blobs.put(db, content), len(content)))
+        db.commit()
+        counts['pdfs'] = len(pdfs)
+
+        now = datetime.now()
+        for batch_start in range(0, patients, batch_size):
+            patient_rows, consultation_rows, exam_rows = [], [], []
+            for patient_id in range(next_patient + batch_start,
+                                    next_patient + min(batch_start + batch_size, patients)):
+                patient_rows.append(make_patient(rng, patient_id))
+                for _ in range(rng.randint(0, round(2 * consultations_per_patient))):
+                    when = now - timedelta(minutes=rng.randrange(5 * 365 * 24 * 60))
+                    consultation_rows.append(
+                        make_consultation(rng, next_consultation, patient_id, transcript_words, when)
+                    )
+                    next_consultation += 1
+                for _ in range(rng.randint(0, round(2 * exams_per_patient))):
+                    sha256, size = rng.choice(pdfs)
+                    exam_rows.append({
+                        'id': next_exam,
+                        'patient_id': patient_id,
+                        'data_exame': now - timedelta(minutes=rng.randrange(5 * 365 * 24 * 60)),
+                        'tipo_exame': rng.choice(EXAM_TYPES),
+                        'arquivo_sha256': sha256,
+                        'arquivo_tamanho': size,
+                        'arquivo_mime': 'application/pdf',
+                        'analise': json.dumps({'tipo_exame': 'Exame laboratorial',
+                                               'interpretacao': 'Dentro da normalidade'}, ensure_ascii=False),
+                    })
+                    next_exam += 1
+
+            # Core inserts on the mapped tables: column types (e.g. compression) still apply
+            db.execute(insert(Patient.__table__), patient_rows)
+            if consultation_rows:
+                db.execute(insert(Consultation.__table__), consultation_rows)
+                index_bulk_consultations(db, consultation_rows)
+            if exam_rows:
+                db.execute(insert(Exam.__table__), exam_rows)
+            db.commit()
+
+            counts['patients'] += len(patient_rows)
+            counts['consultations'] += len(consultation_rows)
+            counts['exams'] += len(exam_rows)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"{counts['patients']} patients, {counts['consultations']} consultations, "
+                      f"{counts['exams']} exams ({elapsed:.0f}s)")
+    finally:
+        db.rollback()
+        advance_sequences(db)
+        db.close()
+    return counts
+
+
+def advance_sequences(db):
+    """Move PostgreSQL id sequences past the explicit ids inserted above"""
+    if db.get_bind().dialect.name != 'postgresql':
+        return
+    for model in (Patient, Consultation, Exam):
+        table = model.__table__.name
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)"
+        ))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--consultations-per-patient', type=float, default=3, help='average per patient')
+    parser.add_argument('--exams-per-patient', type=float, default=1, help='average per patient')
+    parser.add_argument('--transcript-words', type=int, default=600)
+    parser.add_argument('--pdf-size', type=int, default=16 * 1024, help='bytes per PDF')
+    parser.add_argument('--distinct-pdfs', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if not get_session_factory():
+        print("DATABASE_URL is not set")
+        return
+    counts = generate(args.patients, args.consultations_per_patient, args.exams_per_patient,
+                      args.transcript_words, args.pdf_size, args.distinct_pdfs, args.batch_size, args.seed)
+    print(f"done: {counts}")
+
+
+if __name__ == '__main__':
+    main()
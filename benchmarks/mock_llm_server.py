@@ -0,0 +1,156 @@
+"""Local OpenAI-compatible stand-in for the DeepInfra chat completions API.
+
+Serves POST /v1/openai/chat/completions with a canned structured summary,
+simulating first-token latency, a token generation rate, streaming (SSE) and
+injected 429/500 errors.
+
+Usage:
+    python benchmarks/mock_llm_server.py --port 8089 --latency 0.3 --tokens-per-second 200
+    DEEPINFRA_API_URL=http://127.0.0.1:8089/v1/openai/chat/completions streamlit run streamlit_app.py
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SUMMARY_TEXT = """1. **Queixa Principal:** Cefaleia frontal recorrente há três semanas.
+
+2. **História Atual:**
+Paciente refere dor em região frontal e retro-orbitária, com episódios de náusea. Nega febre ou trauma.
+Sem diagnóstico prévio de enxaqueca.
+
+3. **Exame Físico:**
+Não mencionado.
+
+4. **Diagnóstico:**
+Suspeita de sinusite.
+
+5. **Prescrições:**
+Paracetamol de 6 em 6 horas se dor. Tomografia de face.
+
+6. **Observações:**
+Retorno em 15 dias com o resultado do exame."""
+
+
+class MockLLMConfig:
+    def __init__(self, latency=0.2, tokens_per_second=0, error_429_rate=0.0,
+                 error_500_rate=0.0, retry_after=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_429_rate = error_429_rate
+        self.error_500_rate = error_500_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+
+def split_tokens(text):
+    """Split text into ~4 character pseudo-tokens"""
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def make_handler(config):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, data):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self):
+            config.count_request()
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+            roll = random.random()
+            if roll < config.error_429_rate:
+                headers = {'Retry-After': str(config.retry_after)} if config.retry_after is not None else {}
+                return self._send_json(429, {'error': 'rate limited'}, headers)
+            if roll < config.error_429_rate + config.error_500_rate:
+                return self._send_json(500, {'error': 'internal error'})
+
+            time.sleep(config.latency)
+            tokens = split_tokens(SUMMARY_TEXT)
+            delay = 1.0 / config.tokens_per_second if config.tokens_per_second else 0
+
+            if not payload.get('stream'):
+                time.sleep(delay * len(tokens))
+                return self._send_json(200, {
+                    'model': payload.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': SUMMARY_TEXT},
+                                 'finish_reason': 'stop'}]
+                })
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for token in tokens:
+                    if delay:
+                        time.sleep(delay)
+                    event = {'choices': [{'index': 0, 'delta': {'content': token}}]}
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self._write_chunk(b'data: [DONE]\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                # Clients may hang up right after [DONE]
+                self.close_connection = True
+
+    return MockLLMHandler
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Start the mock server on a daemon thread and return it"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server):
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}/v1/openai/chat/completions'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=0, help='0 = instant generation')
+    parser.add_argument('--error-429-rate', type=float, default=0.0)
+    parser.add_argument('--error-500-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=None)
+    args = parser.parse_args()
+
+    config = MockLLMConfig(args.latency, args.tokens_per_second, args.error_429_rate,
+                           args.error_500_rate, args.retry_after)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Mock LLM listening on {server_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
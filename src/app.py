@@ -1,44 +1,64 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import time
-from pathlib import Path
 import json
 import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Import components
+# Import components; the recorder and summarizer (and their HTTP client) are
+# imported on first use to keep cold start short
 try:
     from patient_manager import PatientManager
-    from medical_recorder import MedicalRecorder
     from medical_chat import MedicalChat
     from exam_analyzer import ExamAnalyzer, process_exam
     from database import (
-        SessionLocal, 
-        get_patient_consultations, 
+        get_session_factory,
+        session_scope,
+        get_patient_consultations_page,
+        get_consultation_export,
+        search_consultations,
         create_exam,
-        get_patient_exams,
+        get_patient_exams_page,
         verify_login,
-        delete_exam
+        verify_admin,
+        delete_exam,
+        read_exam_file,
+        get_pool_stats
     )
+    from sql_profiler import profile_queries
+    from render_timing import span, timed, trace_render, recent_renders, background_spans, metrics, start_metrics_server
+    from patient_cache import get_patient_cache, get_patient_data_version
+    from job_queue import get_job_queue, ACTIVE_STATUSES, DONE
 except ImportError:
     try:
         from src.patient_manager import PatientManager
-        from src.medical_recorder import MedicalRecorder
         from src.medical_chat import MedicalChat
         from src.exam_analyzer import ExamAnalyzer, process_exam
         from src.database import (
-            SessionLocal, 
-            get_patient_consultations, 
+            get_session_factory,
+            session_scope,
+            get_patient_consultations_page,
+            get_consultation_export,
+            search_consultations,
             create_exam,
-            get_patient_exams,
+            get_patient_exams_page,
             verify_login,
-            delete_exam
+            verify_admin,
+            delete_exam,
+            read_exam_file,
+            get_pool_stats
+        )
+        from src.sql_profiler import profile_queries
+        from src.render_timing import (
+            span, timed, trace_render, recent_renders, background_spans, metrics, start_metrics_server
         )
+        from src.patient_cache import get_patient_cache, get_patient_data_version
+        from src.job_queue import get_job_queue, ACTIVE_STATUSES, DONE
     except ImportError as e:
         st.error(f"⚠️ Erro ao importar módulos: {str(e)}")
         st.stop()
@@ -51,8 +71,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Check if database is configured
-if not SessionLocal:
+def require_database():
+    """Stop the run with setup instructions unless the database is configured.
+
+    The first call connects and creates the schema (see get_session_factory).
+    """
+    if get_session_factory():
+        return
     st.error("⚠️ Banco de dados não configurado")
     st.info("""
     Para usar este aplicativo, você precisa configurar a conexão com o banco de dados:
@@ -225,6 +250,16 @@ ERROR_MESSAGES = {
     "default": "Erro na gravação"
 }
 
+# Summary sections shown after a consultation, in display order
+SUMMARY_SECTIONS = {
+    'queixa_principal': 'Queixa Principal',
+    'historia_atual': 'História Atual',
+    'exame_fisico': 'Exame Físico',
+    'diagnostico': 'Diagnóstico',
+    'prescricoes': 'Prescrições',
+    'observacoes': 'Observações'
+}
+
 def logout():
     """Handle user logout"""
     for key in list(st.session_state.keys()):
@@ -248,12 +283,104 @@ def login():
         submitted = st.form_submit_button('Entrar')
         
         if submitted:
+            require_database()
             if verify_login(username, password):
                 st.session_state['logged_in'] = True
+                st.session_state['username'] = username
+                st.session_state['is_admin'] = verify_admin(username, password)
                 st.rerun()
             else:
                 st.error('Usuário ou senha incorretos')
 
+# Rows per "Carregar mais" page in the history and exams lists
+PAGE_SIZE = 20
+# Maximum patients shown by the name search
+NAME_SEARCH_LIMIT = 20
+
+# Seconds a cached page of patient data may be served; bounds staleness for
+# writes made by other processes (writes in this process bump the version)
+PATIENT_DATA_CACHE_TTL = int(os.getenv('PATIENT_DATA_CACHE_TTL', '300'))
+PAGE_FETCHERS = {
+    'history_pages': get_patient_consultations_page,
+    'exam_pages': get_patient_exams_page
+}
+
+# Background work off the render path: database warm-up and prefetching the
+# first page of the sections not being shown
+_background = ThreadPoolExecutor(max_workers=2, thread_name_prefix='background')
+
+@st.cache_resource
+def get_patient_manager():
+    return PatientManager()
+
+@st.cache_resource
+def get_medical_chat():
+    return MedicalChat()
+
+@st.cache_resource
+def get_summarizer():
+    """Summarizer shared by all recordings (its LLM client, cache and limiter are thread-safe)"""
+    try:
+        from medical_summarizer import MedicalSummarizer
+    except ImportError:
+        from src.medical_summarizer import MedicalSummarizer
+    return MedicalSummarizer()
+
+def warm_up_database():
+    """Connect and create the schema in the background while the login form is shown"""
+    if os.getenv('DATABASE_URL'):
+        _background.submit(get_session_factory)
+
+@st.cache_data(ttl=PATIENT_DATA_CACHE_TTL, max_entries=2000, show_spinner=False)
+def load_page(state_key, patient_id, version, cursor):
+    """Fetch one page of a patient's list; returns (rows, next_cursor).
+
+    Cached across reruns and sessions. `version` is the patient's data
+    version, so any committed change to the patient's rows makes it miss.
+    """
+    with session_scope() as db:
+        return PAGE_FETCHERS[state_key](db, patient_id, PAGE_SIZE, cursor)
+
+@st.cache_data(ttl=PATIENT_DATA_CACHE_TTL, max_entries=500, show_spinner=False)
+def search_patient_consultations(patient_id, version, query):
+    with session_scope() as db:
+        return search_consultations(db, query, patient_id=patient_id, limit=PAGE_SIZE)
+
+def prefetch_patient_lists(patient_id):
+    """Warm the first history and exams pages in the background, once per data version"""
+    version = get_patient_data_version(patient_id)
+    if st.session_state['prefetched'] == (patient_id, version):
+        return
+    st.session_state['prefetched'] = (patient_id, version)
+    for state_key in PAGE_FETCHERS:
+        _background.submit(load_page, state_key, patient_id, version, None)
+
+def get_loaded_pages(state_key):
+    """Return (rows, next_cursor) for the pages loaded so far of the current patient's list.
+
+    Session state only keeps how many pages are shown; each page comes from
+    load_page, so reruns cost cache hits and "Carregar mais" one query.
+    """
+    patient_id = st.session_state['current_patient'].id
+    pages = st.session_state[state_key]
+    if not pages or pages['patient_id'] != patient_id:
+        pages = {'patient_id': patient_id, 'count': 1}
+        st.session_state[state_key] = pages
+    version = get_patient_data_version(patient_id)
+    rows, cursor = [], None
+    for _ in range(pages['count']):
+        page_rows, cursor = load_page(state_key, patient_id, version, cursor)
+        rows += page_rows
+        if not cursor:
+            break
+    return rows, cursor
+
+def show_load_more(state_key, cursor):
+    """Show a "Carregar mais" button that appends the next page"""
+    if cursor and st.button('Carregar mais', key=f'load_more_{state_key}'):
+        st.session_state[state_key]['count'] += 1
+        st.rerun()
+
 def return_to_home():
     """Clear current patient and return to search view"""
     st.session_state['view'] = 'search'
@@ -315,20 +442,21 @@ def show_delete_confirmation():
     col1, col2 = st.columns([1, 4])
     with col1:
         if st.button("Sim"):
-            db = SessionLocal()
-            if delete_exam(db, st.session_state['delete_confirmation']):
+            with session_scope() as db:
+                deleted = delete_exam(db, st.session_state['delete_confirmation'])
+            if deleted:
                 st.success('Exame excluído com sucesso!')
-                db.close()
                 st.session_state['delete_confirmation'] = None
+                st.session_state['exam_pages'] = None
                 st.rerun()
             else:
                 st.error('Erro ao excluir exame')
-                db.close()
     with col2:
         if st.button("Não"):
             st.session_state['delete_confirmation'] = None
             st.rerun()
 
+@timed('show_search_screen')
 def show_search_screen():
     """Show the patient search screen"""
     st.title('Medical Solutions')
@@ -342,7 +470,7 @@ def show_search_screen():
         """, unsafe_allow_html=True)
         
         # Initialize components
-        patient_manager = PatientManager()
+        patient_manager = get_patient_manager()
         
         # Search tabs
         search_tab1, search_tab2 = st.tabs(['Buscar por CPF', 'Buscar por Nome'])
@@ -368,9 +496,11 @@ def show_search_screen():
             
             if nome and len(nome) >= 3:
                 st.session_state['search_name'] = nome
-                patients = patient_manager.search_patients_by_name(nome)
+                patients = patient_manager.search_patients_by_name(nome, limit=NAME_SEARCH_LIMIT)
                 if patients:
                     st.success(f'Encontrado(s) {len(patients)} paciente(s)')
+                    if len(patients) == NAME_SEARCH_LIMIT:
+                        st.caption(f'Mostrando os {NAME_SEARCH_LIMIT} melhores resultados; refine a busca para ver outros.')
                     for patient in patients:
                         with st.expander(f"{patient.nome} (CPF: {patient.cpf})"):
                             show_patient_preview(patient, patient_manager)
@@ -379,13 +509,275 @@ def show_search_screen():
             elif nome:
                 st.info('Digite pelo menos 3 caracteres para buscar')
 
+# Seconds between reruns while a background job of the shown section is running
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+JOB_LABELS = {'consultation': 'Resumo da consulta', 'exam': 'Análise do exame'}
+
+def run_consultation_job(report, recorder):
+    """Summarize and save a finished recording, reporting sections as they stream in"""
+    sections = {}
+
+    def on_update(section, content):
+        if content:
+            sections[section] = content
+            report(sections)
+
+    return recorder.save_consultation(on_update=on_update)
+
+def run_exam_job(report, content, file_name, patient_id, exam_datetime):
+    """Analyze an uploaded exam file"""
+    file = io.BytesIO(content)
+    file.name = file_name
+    with span('process_exam'):
+        return process_exam(file, patient_id, exam_datetime)
+
+def render_summary(summary):
+    for section, title in SUMMARY_SECTIONS.items():
+        if summary.get(section):
+            st.write(f"**{title}:** {summary[section]}")
+
+def render_exam_analysis(analysis):
+    st.write(f"**Tipo de Exame:** {analysis['tipo_exame']}")
+    st.write(f"**Principais Resultados:** {analysis['resultados']}")
+    st.write(f"**Alterações Significativas:** {analysis['alteracoes']}")
+    st.write(f"**Interpretação Clínica:** {analysis['interpretacao']}")
+    st.write(f"**Recomendações:** {analysis['recomendacoes']}")
+
+def show_jobs(kind, render_result):
+    """Show the current patient's background jobs of `kind`; returns True while any is running"""
+    queue = get_job_queue()
+    active = False
+    for job in queue.list_jobs(st.session_state['current_patient'].id, kind, limit=5):
+        label = JOB_LABELS[kind]
+        started = datetime.fromtimestamp(job['created_at']).strftime('%H:%M:%S')
+        if job['status'] in ACTIVE_STATUSES:
+            active = True
+            st.info(f"⏳ {label}: em processamento (enviado às {started})...")
+            if job['progress']:
+                render_result(job['progress'])
+            continue
+        if job['status'] == DONE:
+            result = queue.result(job['id'])
+            if result:
+                st.success(f"{label}: processamento concluído (enviado às {started})")
+                render_result(result)
+            else:
+                st.warning(f"{label}: nenhum resultado (enviado às {started})")
+        else:
+            st.error(f"{label}: falha no processamento (enviado às {started}): {job['error']}")
+        if st.button('Fechar', key=f"dismiss_job_{job['id']}"):
+            queue.dismiss(job['id'])
+            st.rerun()
+    return active
+
+def poll_jobs():
+    """Rerun after a short wait so running jobs' progress is refreshed"""
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+@timed('section.nova_consulta')
+def show_new_consultation():
+    """New consultation section: recording and summary"""
+    st.header('Nova Consulta')
+
+    if not st.session_state['recording']:
+        if st.button('Iniciar Gravação'):
+            try:
+                from medical_recorder import MedicalRecorder
+            except ImportError:
+                from src.medical_recorder import MedicalRecorder
+            st.session_state['recording'] = True
+            st.session_state['recorder'] = MedicalRecorder(
+                st.session_state['current_patient'].id, summarizer=get_summarizer()
+            )
+            if not st.session_state['recorder'].start_recording():
+                st.session_state['recording'] = False
+                st.session_state['recorder'] = None
+            st.rerun()
+    else:
+        st.warning('Gravação em andamento...')
+
+        if st.button('Finalizar Gravação'):
+            # Summarized and saved in the background; progress is shown below
+            get_job_queue().submit('consultation', run_consultation_job, st.session_state['recorder'],
+                                   patient_id=st.session_state['current_patient'].id)
+            st.session_state['recording'] = False
+            st.session_state['recorder'] = None
+            st.rerun()
+
+    if show_jobs('consultation', render_summary):
+        poll_jobs()
+
+@timed('section.historico')
+def show_history():
+    """History section: consultation search and paginated list"""
+    st.header('Histórico de Consultas')
+
+    # Full-text search over this patient's transcripts and summaries
+    busca = st.text_input('Buscar nas consultas:', key='consultation_search_query',
+                          help='Ex.: tosse febre (encontra consultas com todos os termos)')
+    if busca:
+        patient_id = st.session_state['current_patient'].id
+        results = search_patient_consultations(patient_id, get_patient_data_version(patient_id), busca)
+        if results:
+            for consultation_id, data_consulta, snippet in results:
+                st.markdown(f"**{data_consulta.strftime('%d/%m/%Y %H:%M')}** — {snippet}")
+        else:
+            st.info('Nenhuma consulta encontrada com esses termos.')
+        st.divider()
+
+    # Get patient's consultations (summary fields only), newest first
+    consultations, history_cursor = get_loaded_pages('history_pages')
+
+    if consultations:
+        for i, consultation in enumerate(consultations):
+            with st.expander(f"Consulta {consultation.data_consulta.strftime('%d/%m/%Y %H:%M')}"):
+                st.write(f"**Queixa Principal:** {consultation.queixa_principal}")
+                st.write(f"**História Atual:** {consultation.historia_atual}")
+                if consultation.exame_fisico:
+                    st.write(f"**Exame Físico:** {consultation.exame_fisico}")
+                st.write(f"**Diagnóstico:** {consultation.diagnostico}")
+                st.write(f"**Prescrições:** {consultation.prescricoes}")
+                if consultation.observacoes:
+                    st.write(f"**Observações:** {consultation.observacoes}")
+
+                # Option to download full consultation data; transcript and
+                # segments are only loaded once requested
+                if st.session_state['consultation_download'] == consultation.id:
+                    with span('historico.export'), session_scope() as db:
+                        consultation_data = get_consultation_export(db, consultation.id)
+                    st.download_button(
+                        'Baixar JSON completo',
+                        data=json.dumps(consultation_data, ensure_ascii=False, indent=2),
+                        file_name=f'consulta_{consultation.data_consulta.strftime("%Y%m%d_%H%M%S")}.json',
+                        mime='application/json',
+                        key=f'download_consultation_{i}'
+                    )
+                elif st.button('📄 Preparar JSON completo', key=f'prepare_consultation_{i}'):
+                    st.session_state['consultation_download'] = consultation.id
+                    st.rerun()
+        show_load_more('history_pages', history_cursor)
+    else:
+        st.info('Nenhuma consulta encontrada para este paciente.')
+
+@timed('section.exames')
+def show_exams():
+    """Exams section: upload, paginated list, download and deletion"""
+    st.header('Exames')
+
+    # Show delete confirmation if needed
+    if st.session_state['delete_confirmation']:
+        show_delete_confirmation()
+
+    # Upload new exam
+    uploaded_file = st.file_uploader("Carregar novo exame (PDF)", type=['pdf'])
+    if uploaded_file:
+        # Add date input for exam date
+        exam_date = st.date_input(
+            "Data do Exame",
+            datetime.now(),
+            help="Selecione a data em que o exame foi realizado",
+            format="DD/MM/YYYY"  # Format date input in Brazilian format
+        )
+
+        if st.button('Processar Exame'):
+            # Analyzed in the background; progress is shown below
+            patient_id = st.session_state['current_patient'].id
+            exam_datetime = datetime.combine(exam_date, datetime.min.time())
+            get_job_queue().submit('exam', run_exam_job, uploaded_file.getvalue(), uploaded_file.name,
+                                   patient_id, exam_datetime, patient_id=patient_id)
+            st.rerun()
+
+    jobs_active = show_jobs('exam', render_exam_analysis)
+
+    # Show existing exams
+    st.subheader('Exames Anteriores')
+    exams, exams_cursor = get_loaded_pages('exam_pages')
+
+    if exams:
+        for i, exam in enumerate(exams):
+            # Format exam date in Brazilian format
+            exam_date_str = exam.data_exame.strftime('%d/%m/%Y')
+            with st.expander(f"Exame {exam_date_str} - {exam.tipo_exame}"):
+                with span('exames.json_decode'):
+                    analysis = json.loads(exam.analise) if exam.analise else {}
+                st.write(f"**Data do Exame:** {exam_date_str}")
+                st.write(f"**Principais Resultados:** {analysis.get('resultados', '')}")
+                st.write(f"**Alterações:** {analysis.get('alteracoes', '')}")
+                st.write(f"**Interpretação:** {analysis.get('interpretacao', '')}")
+                st.write(f"**Recomendações:** {analysis.get('recomendacoes', '')}")
+
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    # Option to download PDF with formatted date; the file is
+                    # only read from the blob store once requested
+                    if st.session_state['exam_download'] == exam.id:
+                        with session_scope() as db:
+                            content = read_exam_file(db, exam)
+                        if content:
+                            filename = f"{exam.tipo_exame} - {exam_date_str}.pdf"
+                            st.download_button(
+                                'Baixar PDF original',
+                                data=content,
+                                file_name=filename,
+                                mime=exam.arquivo_mime or 'application/pdf',
+                                key=f'download_exam_{i}'
+                            )
+                        else:
+                            st.info('Arquivo original não disponível.')
+                    elif st.button('📄 Preparar PDF original', key=f'prepare_exam_{i}'):
+                        st.session_state['exam_download'] = exam.id
+                        st.rerun()
+                with col2:
+                    # Delete button
+                    if st.button('🗑️ Excluir', key=f'delete_exam_{i}'):
+                        st.session_state['delete_confirmation'] = exam.id
+                        st.rerun()
+        show_load_more('exam_pages', exams_cursor)
+    else:
+        st.info('Nenhum exame encontrado para este paciente.')
+
+    if jobs_active:
+        poll_jobs()
+
+@timed('section.chat')
+def show_chat():
+    """Chat section over the patient's history"""
+    medical_chat = get_medical_chat()
+    st.header('Chat Médico')
+    st.write('Faça perguntas sobre o histórico do paciente:')
+
+    # Chat interface
+    query = st.text_input('Sua pergunta:')
+    if st.button('Enviar'):
+        if query:
+            with st.spinner('Processando...'):
+                response = medical_chat.query_history(st.session_state['current_patient'].id, query)
+                st.session_state['chat_messages'].append(('user', query))
+                st.session_state['chat_messages'].append(('assistant', response))
+
+    # Display chat history
+    for role, message in st.session_state['chat_messages']:
+        if role == 'user':
+            st.write(f"👨‍⚕️ **Médico:** {message}")
+        else:
+            st.write(f"🤖 **Assistente:** {message}")
+
+# Sections of the patient page, in display order
+PATIENT_SECTIONS = {
+    'Nova Consulta': show_new_consultation,
+    'Histórico': show_history,
+    'Exames': show_exams,
+    'Chat Médico': show_chat
+}
+
+@timed('show_patient_data')
 def show_patient_data():
     """Show patient data and content"""
     st.title('Medical Solutions')
     
     # Initialize components
-    patient_manager = PatientManager()
-    medical_chat = MedicalChat()
+    patient_manager = get_patient_manager()
     
     # Show current patient header with return button
     patient_info = patient_manager.format_patient_info(st.session_state['current_patient'])
@@ -419,170 +811,14 @@ def show_patient_data():
     if st.button("🏠 Voltar para Pesquisa"):
         return_to_home()
 
-    # Tabs for different views
-    tab1, tab2, tab3, tab4 = st.tabs(['Nova Consulta', 'Histórico', 'Exames', 'Chat Médico'])
-    
-    # New Consultation Tab
-    with tab1:
-        st.header('Nova Consulta')
-        
-        if not st.session_state['recording']:
-            if st.button('Iniciar Gravação'):
-                st.session_state['recording'] = True
-                st.session_state['recorder'] = MedicalRecorder(st.session_state['current_patient'].id)
-                if not st.session_state['recorder'].start_recording():
-                    st.session_state['recording'] = False
-                    st.session_state['recorder'] = None
-                st.rerun()
-        else:
-            st.warning('Gravação em andamento...')
-            
-            if st.button('Finalizar Gravação'):
-                with st.spinner('Processando...'):
-                    consultation_data = st.session_state['recorder'].save_consultation()
-                    if consultation_data:
-                        st.success('Consulta processada com sucesso!')
-                        st.subheader('Resumo da Consulta:')
-                        st.write(f"**Queixa Principal:** {consultation_data['queixa_principal']}")
-                        st.write(f"**Diagnóstico:** {consultation_data['diagnostico']}")
-                        st.write(f"**Prescrições:** {consultation_data['prescricoes']}")
-                        st.session_state['recording'] = False
-                        st.session_state['recorder'] = None
-                        st.rerun()
-    
-    # History Tab
-    with tab2:
-        st.header('Histórico de Consultas')
-        
-        # Get patient's consultations
-        db = SessionLocal()
-        consultations = get_patient_consultations(db, st.session_state['current_patient'].id)
-        
-        if consultations:
-            for i, consultation in enumerate(consultations):
-                with st.expander(f"Consulta {consultation.data_consulta.strftime('%d/%m/%Y %H:%M')}"):
-                    st.write(f"**Queixa Principal:** {consultation.queixa_principal}")
-                    st.write(f"**História Atual:** {consultation.historia_atual}")
-                    if consultation.exame_fisico:
-                        st.write(f"**Exame Físico:** {consultation.exame_fisico}")
-                    st.write(f"**Diagnóstico:** {consultation.diagnostico}")
-                    st.write(f"**Prescrições:** {consultation.prescricoes}")
-                    if consultation.observacoes:
-                        st.write(f"**Observações:** {consultation.observacoes}")
-                    
-                    # Option to download full consultation data
-                    consultation_data = {
-                        'data_consulta': consultation.data_consulta.isoformat(),
-                        'transcricao_completa': consultation.transcricao_completa,
-                        'resumo_clinico': json.loads(consultation.resumo_clinico) if consultation.resumo_clinico else {},
-                        'segmentos_detalhados': json.loads(consultation.segmentos_detalhados) if consultation.segmentos_detalhados else []
-                    }
-                    st.download_button(
-                        'Baixar JSON completo',
-                        data=json.dumps(consultation_data, ensure_ascii=False, indent=2),
-                        file_name=f'consulta_{consultation.data_consulta.strftime("%Y%m%d_%H%M%S")}.json',
-                        mime='application/json',
-                        key=f'download_consultation_{i}'
-                    )
-        else:
-            st.info('Nenhuma consulta encontrada para este paciente.')
-        
-        db.close()
-    
-    # Exams Tab
-    with tab3:
-        st.header('Exames')
-        
-        # Show delete confirmation if needed
-        if st.session_state['delete_confirmation']:
-            show_delete_confirmation()
-        
-        # Upload new exam
-        uploaded_file = st.file_uploader("Carregar novo exame (PDF)", type=['pdf'])
-        if uploaded_file:
-            # Add date input for exam date
-            exam_date = st.date_input(
-                "Data do Exame",
-                datetime.now(),
-                help="Selecione a data em que o exame foi realizado",
-                format="DD/MM/YYYY"  # Format date input in Brazilian format
-            )
-            
-            if st.button('Processar Exame'):
-                with st.spinner('Analisando exame...'):
-                    # Convert date to datetime
-                    exam_datetime = datetime.combine(exam_date, datetime.min.time())
-                    analysis = process_exam(uploaded_file, st.session_state['current_patient'].id, exam_datetime)
-                    if analysis:
-                        st.success('Exame processado com sucesso!')
-                        st.subheader('Análise do Exame:')
-                        st.write(f"**Tipo de Exame:** {analysis['tipo_exame']}")
-                        st.write(f"**Principais Resultados:** {analysis['resultados']}")
-                        st.write(f"**Alterações Significativas:** {analysis['alteracoes']}")
-                        st.write(f"**Interpretação Clínica:** {analysis['interpretacao']}")
-                        st.write(f"**Recomendações:** {analysis['recomendacoes']}")
-        
-        # Show existing exams
-        st.subheader('Exames Anteriores')
-        db = SessionLocal()
-        exams = get_patient_exams(db, st.session_state['current_patient'].id)
-        
-        if exams:
-            for i, exam in enumerate(exams):
-                # Format exam date in Brazilian format
-                exam_date_str = exam.data_exame.strftime('%d/%m/%Y')
-                with st.expander(f"Exame {exam_date_str} - {exam.tipo_exame}"):
-                    analysis = json.loads(exam.analise) if exam.analise else {}
-                    st.write(f"**Data do Exame:** {exam_date_str}")
-                    st.write(f"**Principais Resultados:** {analysis.get('resultados', '')}")
-                    st.write(f"**Alterações:** {analysis.get('alteracoes', '')}")
-                    st.write(f"**Interpretação:** {analysis.get('interpretacao', '')}")
-                    st.write(f"**Recomendações:** {analysis.get('recomendacoes', '')}")
-                    
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        # Option to download PDF with formatted date
-                        if exam.arquivo_pdf:
-                            filename = f"{exam.tipo_exame} - {exam_date_str}.pdf"
-                            st.download_button(
-                                'Baixar PDF original',
-                                data=exam.arquivo_pdf,
-                                file_name=filename,
-                                mime='application/pdf',
-                                key=f'download_exam_{i}'
-                            )
-                    with col2:
-                        # Delete button
-                        if st.button('🗑️ Excluir', key=f'delete_exam_{i}'):
-                            st.session_state['delete_confirmation'] = exam.id
-                            st.rerun()
-        else:
-            st.info('Nenhum exame encontrado para este paciente.')
-        
-        db.close()
-    
-    # Chat Tab
-    with tab4:
-        st.header('Chat Médico')
-        st.write('Faça perguntas sobre o histórico do paciente:')
-        
-        # Chat interface
-        query = st.text_input('Sua pergunta:')
-        if st.button('Enviar'):
-            if query:
-                with st.spinner('Processando...'):
-                    response = medical_chat.query_history(st.session_state['current_patient'].id, query)
-                    st.session_state['chat_messages'].append(('user', query))
-                    st.session_state['chat_messages'].append(('assistant', response))
-        
-        # Display chat history
-        for role, message in st.session_state['chat_messages']:
-            if role == 'user':
-                st.write(f"👨‍⚕️ **Médico:** {message}")
-            else:
-                st.write(f"🤖 **Assistente:** {message}")
+    # Only the selected section runs its queries and rendering, so an
+    # interaction in one section does not re-render the others
+    section = st.radio('Seção', list(PATIENT_SECTIONS), key='patient_section',
+                       horizontal=True, label_visibility='collapsed')
+    PATIENT_SECTIONS[section]()
+    prefetch_patient_lists(st.session_state['current_patient'].id)
 
-def main():
+def render():
     # Add logout button if logged in
     if st.session_state['logged_in']:
         col1, col2 = st.columns([11, 1])
@@ -591,8 +827,10 @@ def main():
                 logout()
     
     if not st.session_state['logged_in']:
+        warm_up_database()
         login()
     else:
+        require_database()
         if st.session_state['view'] == 'search':
             show_search_screen()
         elif st.session_state['current_patient']:
@@ -600,5 +838,72 @@ def main():
         else:
             show_search_screen()
 
+    # Optional connection pool and patient cache metrics for diagnosing leaks/saturation
+    if os.getenv('SHOW_DB_POOL_STATS') == '1':
+        with st.sidebar.expander('Pool de conexões'):
+            st.json(get_pool_stats())
+        with st.sidebar.expander('Cache de pacientes'):
+            st.json(get_patient_cache().get_stats())
+        with st.sidebar.expander('Fila de tarefas'):
+            st.json(get_job_queue().get_stats())
+
+def show_query_profile(profile):
+    """Sidebar panel with the statements issued by this run"""
+    summary = profile.summary()
+    with st.sidebar.expander(f"SQL: {summary['queries']} consultas, {summary['sql_ms']:.0f} ms"):
+        if summary['n_plus_one']:
+            st.warning(f"Possível N+1: {len(summary['n_plus_one'])} consulta(s) repetida(s)")
+        st.json(summary)
+
+def is_admin():
+    """Whether the logged-in user passed the admin credential check at login"""
+    return st.session_state['logged_in'] and st.session_state['is_admin']
+
+def span_table(spans):
+    st.table([{'trecho': span_summary['name'], 'chamadas': span_summary['count'],
+               'total ms': span_summary['total_ms'], 'máx ms': span_summary['max_ms']}
+              for span_summary in spans])
+
+def show_render_timings():
+    """Admin sidebar panel with the timing breakdown of the last renders.
+
+    Summaries and exam analysis run on the job queue, outside any render, so
+    their spans are listed separately as process-wide totals.
+    """
+    renders = recent_renders(int(os.getenv('RENDER_PANEL_RENDERS', '10')))
+    with st.sidebar.expander(f'Desempenho: últimas {len(renders)} renderizações'):
+        for trace in renders:
+            st.markdown(
+                f"**{trace['label']}** ({trace['outcome']}) — {trace['render_ms']:.0f} ms, "
+                f"SQL {trace['sql_ms']:.0f} ms em {trace['sql_queries']} consulta(s)"
+            )
+            if trace['spans']:
+                span_table(trace['spans'])
+        background = background_spans()
+        if background:
+            st.markdown('**Tarefas em segundo plano** (desde o início do processo)')
+            span_table(background)
+        st.download_button('Exportar JSON lines',
+                           data=''.join(json.dumps(trace, ensure_ascii=False) + '\n' for trace in renders),
+                           file_name='render_timings.jsonl', mime='application/x-ndjson')
+        st.download_button('Exportar métricas (Prometheus)', data=metrics.prometheus_text(),
+                           file_name='metrics.txt', mime='text/plain')
+
+def main():
+    # RENDER_METRICS_PORT serves the span histograms at /metrics
+    start_metrics_server()
+    with trace_render(f"view={st.session_state['view']}"):
+        # SQL_PROFILE=1 logs slow renders as JSON; SHOW_SQL_PROFILE=1 also shows the panel
+        show_panel = os.getenv('SHOW_SQL_PROFILE') == '1'
+        if not show_panel and os.getenv('SQL_PROFILE') != '1':
+            render()
+        else:
+            with profile_queries(f"view={st.session_state['view']}") as profile:
+                render()
+                if show_panel:
+                    show_query_profile(profile)
+        if is_admin():
+            show_render_timings()
+
 if __name__ == '__main__':
     main()
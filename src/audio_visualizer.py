@@ -1,7 +1,4 @@
 import streamlit as st
-import pyaudio
-import numpy as np
-import matplotlib.pyplot as plt
 import io
 import time
 import threading
@@ -9,6 +6,14 @@ import queue
 
 class AudioVisualizer:
     def __init__(self):
+        # pyaudio, matplotlib e numpy são carregados só quando o visualizador é
+        # criado, para não pesar na importação do módulo
+        import pyaudio
+        import numpy as np
+        import matplotlib.pyplot as plt
+        self.pyaudio = pyaudio
+        self.np = np
+
         # Configurações de áudio
         self.CHUNK = 1024  # Tamanho do buffer de áudio
         self.FORMAT = pyaudio.paFloat32
@@ -43,6 +48,7 @@ class AudioVisualizer:
         
     def audio_callback(self, in_data, frame_count, time_info, status):
         """Callback chamado quando novos dados de áudio estão disponíveis"""
+        np = self.np
         try:
             # Converte os bytes em array numpy
             audio_data = np.frombuffer(in_data, dtype=np.float32)
@@ -55,10 +61,10 @@ class AudioVisualizer:
             # Coloca os dados na fila
             self.q.put(audio_data)
             
-            return (in_data, pyaudio.paContinue)
+            return (in_data, self.pyaudio.paContinue)
         except Exception as e:
             print(f"Erro no callback de áudio: {str(e)}")
-            return (in_data, pyaudio.paComplete)
+            return (in_data, self.pyaudio.paComplete)
     
     def get_audio_plot(self):
         """Gera uma imagem do plot atual"""
@@ -0,0 +1,112 @@
+"""Back-fill structured summaries for stored consultations.
+
+Usage:
+    python src/backfill_summaries.py [--batch-size 50] [--concurrency 8] [--all]
+"""
+import json
+import argparse
+from sqlalchemy import or_
+from sqlalchemy.orm import undefer
+try:
+    from database import get_session_factory, Consultation
+    from medical_summarizer import MedicalSummarizer
+except ImportError:
+    from src.database import get_session_factory, Consultation
+    from src.medical_summarizer import MedicalSummarizer
+
+SUMMARY_FIELDS = [
+    'queixa_principal',
+    'historia_atual',
+    'exame_fisico',
+    'diagnostico',
+    'prescricoes',
+    'observacoes'
+]
+
+
+def load_segments(segmentos_detalhados):
+    """Decode stored segments; None when missing or malformed (sentences are used instead)"""
+    if not segmentos_detalhados:
+        return None
+    try:
+        segments = json.loads(segmentos_detalhados)
+    except ValueError:
+        return None
+    return segments if isinstance(segments, list) else None
+
+
+def iter_pending_batches(db, batch_size, include_all=False):
+    """Yield batches of consultations needing a summary, paging by id"""
+    last_id = 0
+    while True:
+        query = db.query(Consultation).options(
+            undefer(Consultation.transcricao_completa),
+            undefer(Consultation.segmentos_detalhados)
+        ).filter(
+            Consultation.id > last_id,
+            Consultation.transcricao_completa.isnot(None)
+        )
+        if not include_all:
+            query = query.filter(or_(
+                Consultation.queixa_principal.is_(None),
+                Consultation.queixa_principal == ''
+            ))
+        batch = query.order_by(Consultation.id).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def backfill(batch_size=50, concurrency=8, include_all=False):
+    """Summarize pending consultations and write results back batch by batch.
+
+    Returns the number of consultations that got a summary; failed ones are
+    left unchanged and counted separately.
+    """
+    SessionLocal = get_session_factory()
+    if not SessionLocal:
+        print("DATABASE_URL não configurado")
+        return 0
+
+    # --concurrency caps every LLM request of the run, chunk and reduce calls included
+    summarizer = MedicalSummarizer(max_concurrency=concurrency)
+    db = SessionLocal()
+    updated = 0
+    failed = 0
+    try:
+        for batch in iter_pending_batches(db, batch_size, include_all):
+            # Long transcripts are split on their segments and map-reduced
+            summaries = summarizer.summarize_many_long(
+                [(c.transcricao_completa, load_segments(c.segmentos_detalhados)) for c in batch],
+                max_concurrency=concurrency
+            )
+            for consultation, summary in zip(batch, summaries):
+                # Leave failed items untouched so a later run retries them
+                if summary is None:
+                    failed += 1
+                    continue
+                for field in SUMMARY_FIELDS:
+                    setattr(consultation, field, summary[field])
+                consultation.resumo_clinico = json.dumps(summary, ensure_ascii=False)
+                updated += 1
+            db.commit()
+            print(f"{updated} consultas atualizadas ({failed} falhas)")
+    finally:
+        db.close()
+
+    print(f"Estatísticas: {summarizer.get_stats()}")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera resumos para consultas já gravadas')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--all', action='store_true', help='Regerar resumos de todas as consultas')
+    args = parser.parse_args()
+    backfill(args.batch_size, args.concurrency, args.all)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import os
+import zlib
+import hashlib
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+try:
+    from compressed_text import zstandard_module
+except ImportError:
+    from src.compressed_text import zstandard_module
+
+# Load environment variables
+load_dotenv()
+
+
+def _compressor(method):
+    """Return (method used, compressobj or None); zstd falls back to zlib without zstandard"""
+    if method == 'zstd':
+        zstandard = zstandard_module()
+        if zstandard is not None:
+            return method, zstandard.ZstdCompressor(level=3).compressobj()
+        method = 'zlib'
+    if method == 'zlib':
+        return method, zlib.compressobj(6)
+    return method, None
+
+
+def _decompressor(method):
+    if method == 'zstd':
+        zstandard = zstandard_module()
+        if zstandard is None:
+            raise ValueError("exame comprimido com zstd, mas zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if method == 'zlib':
+        return zlib.decompressobj()
+    return None
+
+
+class BlobStore:
+    """Content-addressed store for exam files, kept in a separate table.
+
+    Blobs are keyed by the SHA-256 of their uncompressed content, so identical
+    uploads are stored once. iter_chunks reads in chunks with SUBSTR queries
+    and decompresses incrementally, so no single query loads the whole row;
+    callers that need the full content (read) still hold it in memory.
+    """
+
+    def __init__(self, model, compression=None, chunk_size=None):
+        self.model = model
+        self.compression = compression or os.getenv('BLOB_COMPRESSION', 'none')
+        self.chunk_size = chunk_size or int(os.getenv('BLOB_CHUNK_SIZE', str(256 * 1024)))
+
+    def _exists(self, db, sha256):
+        return db.query(self.model.sha256).filter(self.model.sha256 == sha256).first() is not None
+
+    def put(self, db, data):
+        """Store `data` if not already present and return its SHA-256.
+
+        Safe against concurrent uploads of the same content: the insert runs
+        in a savepoint, and losing the race to another session just means
+        the blob is already stored.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self._exists(db, sha256):
+            return sha256
+
+        stored = data
+        method, compressor = _compressor(self.compression)
+        if compressor is not None:
+            compressed = compressor.compress(data)
+            compressed += compressor.flush()
+            # Keep the raw bytes when compression does not pay off (e.g. most PDFs)
+            if len(compressed) < len(data):
+                stored = compressed
+        try:
+            with db.begin_nested():
+                db.add(self.model(
+                    sha256=sha256,
+                    tamanho=len(data),
+                    compressao=method if stored is not data else 'none',
+                    dados=stored
+                ))
+        except IntegrityError:
+            # Inserted by another session after the check above
+            pass
+        return sha256
+
+    def iter_chunks(self, db, sha256):
+        """Yield the uncompressed content of a blob in chunks"""
+        blob = db.query(self.model.compressao, func.length(self.model.dados)).filter(
+            self.model.sha256 == sha256
+        ).first()
+        if not blob:
+            return
+        method, stored_size = blob
+        decompressor = _decompressor(method)
+
+        for offset in range(1, stored_size + 1, self.chunk_size):
+            chunk = db.query(func.substr(self.model.dados, offset, self.chunk_size)).filter(
+                self.model.sha256 == sha256
+            ).scalar()
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield bytes(chunk)
+        if method == 'zlib':
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+
+    def read(self, db, sha256):
+        """Return the full uncompressed content of a blob, or None"""
+        if not self._exists(db, sha256):
+            return None
+        return b''.join(self.iter_chunks(db, sha256))
+
+    def delete(self, db, sha256):
+        """Remove a blob (callers check it is no longer referenced)"""
+        db.query(self.model).filter(self.model.sha256 == sha256).delete(synchronize_session=False)
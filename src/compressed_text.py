@@ -0,0 +1,151 @@
+import os
+import zlib
+import threading
+from dotenv import load_dotenv
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+# Load environment variables
+load_dotenv()
+
+# First byte of every encoded value; bump when the layout changes
+FORMAT_VERSION = 1
+# Second byte: how the UTF-8 payload is stored
+METHODS = {'none': 0, 'zlib': 1, 'zstd': 2}
+_METHOD_NAMES = {code: name for name, code in METHODS.items()}
+
+_local = threading.local()
+_zstandard = None
+
+
+def zstandard_module():
+    """The zstandard module, imported on first use (it is not needed to
+    render the app); None when it is not installed"""
+    global _zstandard
+    if _zstandard is None:
+        try:
+            import zstandard
+        except ImportError:
+            print("zstandard não instalado; usando zlib para compressão")
+            zstandard = False
+        _zstandard = zstandard
+    return _zstandard or None
+
+
+def _zstd_compressor():
+    """This thread's zstd compressor, or None without zstandard"""
+    # zstd contexts are not thread-safe; keep one per thread
+    if not hasattr(_local, 'compressor'):
+        zstandard = zstandard_module()
+        if zstandard is None:
+            return None
+        _local.compressor = zstandard.ZstdCompressor(level=3)
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.compressor
+
+
+def _zstd_decompressor():
+    if _zstd_compressor() is None:
+        return None
+    return _local.decompressor
+
+
+def is_encoded(value):
+    """Whether a raw column value was written by CompressedText (vs. legacy plain text)"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= 2 and value[0] == FORMAT_VERSION
+
+
+def encode_text(value, method='zlib', min_size=256):
+    """Encode text as version byte + method byte + (compressed) UTF-8"""
+    data = value.encode('utf-8')
+    code = METHODS['none']
+    if len(data) >= min_size:
+        if method == 'zstd' and _zstd_compressor() is None:
+            method = 'zlib'
+        if method == 'zstd':
+            compressed = _zstd_compressor().compress(data)
+        elif method == 'zlib':
+            compressed = zlib.compress(data, 6)
+        else:
+            compressed = None
+        # Short or already dense text can grow when compressed
+        if compressed is not None and len(compressed) < len(data):
+            data, code = compressed, METHODS[method]
+    return bytes((FORMAT_VERSION, code)) + data
+
+
+def decode_text(value):
+    """Decode a raw column value, accepting legacy plain text rows"""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not is_encoded(value):
+        # Text columns converted to binary in place (PostgreSQL upgrade)
+        return value.decode('utf-8')
+    method, payload = _METHOD_NAMES.get(value[1]), value[2:]
+    if method == 'zlib':
+        payload = zlib.decompress(payload)
+    elif method == 'zstd':
+        decompressor = _zstd_decompressor()
+        if decompressor is None:
+            raise ValueError("valor comprimido com zstd, mas zstandard não está instalado")
+        payload = decompressor.decompress(payload)
+    elif method != 'none':
+        raise ValueError(f"método de compressão desconhecido: {value[1]}")
+    return payload.decode('utf-8')
+
+
+class _RawBinary(LargeBinary):
+    """LargeBinary that passes results through untouched, since rows written
+    before compression was enabled may still hold text, and binds str values
+    as text for columns not yet converted to binary"""
+
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+        if process is None:
+            return None
+
+        def bind(value):
+            return value if isinstance(value, str) else process(value)
+        return bind
+
+    def result_processor(self, dialect, coltype):
+        return None
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed; reads and writes plain str.
+
+    The method comes from TEXT_COMPRESSION (zstd, zlib or none; zstd falls
+    back to zlib without zstandard) and values shorter than
+    TEXT_COMPRESSION_MIN_SIZE bytes are stored uncompressed.
+    Every value carries a version byte, so the method can change later and old
+    rows stay readable.
+    """
+
+    impl = _RawBinary
+    cache_ok = True
+
+    def __init__(self, method=None, min_size=None):
+        super().__init__()
+        method = method or os.getenv('TEXT_COMPRESSION', 'zstd')
+        if method not in METHODS:
+            raise ValueError(f"TEXT_COMPRESSION inválido: {method}")
+        self.method = method
+        self.min_size = min_size if min_size is not None else int(os.getenv('TEXT_COMPRESSION_MIN_SIZE', '256'))
+        # Shared with the per-dialect copies SQLAlchemy makes of this type
+        self._storage = {'plain_text': False}
+
+    def store_plain_text(self, enabled=True):
+        """Write plain str while the database column is still a text column
+        (PostgreSQL tables created before compression, until migrate_compression.py runs)"""
+        self._storage['plain_text'] = enabled
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if self._storage['plain_text']:
+            return value
+        return encode_text(value, self.method, self.min_size)
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value)
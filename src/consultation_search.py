@@ -0,0 +1,414 @@
+import re
+from sqlalchemy import event, inspect, select, text, table, column
+from sqlalchemy.orm import Session
+
+try:
+    from patient_search import normalize_name, fts5_available
+except ImportError:
+    from src.patient_search import normalize_name, fts5_available
+
+# Consultation columns covered by the full-text index
+INDEXED_FIELDS = [
+    'queixa_principal',
+    'historia_atual',
+    'exame_fisico',
+    'diagnostico',
+    'prescricoes',
+    'observacoes',
+    'transcricao_completa',
+]
+
+# Summary fields weigh more than the transcript when ranking (FTS5 bm25 weights)
+_FTS5_WEIGHTS = ', '.join('1.0' if field == 'transcricao_completa' else '2.0' for field in INDEXED_FIELDS)
+
+_FTS5_TABLE = table('consultations_fts', column('rowid'))
+# Search structures created outside the SQLAlchemy metadata
+SEARCH_TABLES = ['consultations_fts', 'consultation_search']
+SUMMARY_FIELDS = [field for field in INDEXED_FIELDS if field != 'transcricao_completa']
+# Words shown in a search result snippet
+SNIPPET_WORDS = 16
+_WORD = re.compile(r'\w+')
+
+_sync_installed = False
+# Contentless FTS5 tables accept DELETE by rowid from SQLite 3.43 (contentless_delete=1);
+# older versions need the indexed values back to remove a row
+_fts5_delete_by_rowid = False
+
+
+def _setup_sqlite(connection):
+    global _fts5_delete_by_rowid
+    if not fts5_available(connection):
+        return None
+    sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultations_fts'"
+    )).scalar()
+    if sql and "content=''" not in sql:
+        # Earlier versions kept a full uncompressed copy of every document
+        connection.execute(text("DROP TABLE consultations_fts"))
+        sql = None
+    if sql:
+        _fts5_delete_by_rowid = 'contentless_delete' in sql
+        return False
+    # Contentless: only the inverted index is stored; snippets are built from
+    # the (compressed) consultation rows. No Portuguese stemmer ships with
+    # SQLite; accents are folded and query terms are matched as prefixes instead
+    version = tuple(int(part) for part in connection.execute(text("SELECT sqlite_version()")).scalar().split('.'))
+    _fts5_delete_by_rowid = version >= (3, 43, 0)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE consultations_fts USING fts5({', '.join(INDEXED_FIELDS)}, content='', "
+        + ("contentless_delete=1, " if _fts5_delete_by_rowid else "") +
+        "tokenize='unicode61 remove_diacritics 2')"
+    ))
+    return True
+
+
+def _setup_postgresql(connection):
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            connection.execute(text(
+                "DO $$ BEGIN "
+                "IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN "
+                "CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese); "
+                "ALTER TEXT SEARCH CONFIGURATION pt_unaccent "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem; "
+                "END IF; END $$"
+            ))
+            exists = connection.execute(text("SELECT to_regclass('consultation_search')")).scalar()
+            if exists:
+                copies_text = connection.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'consultation_search' AND column_name = 'transcricao_completa'"
+                )).first()
+                if not copies_text:
+                    return False
+                # Earlier versions kept a full uncompressed copy of every document
+                connection.execute(text("DROP TABLE consultation_search"))
+            # Only the tsvector is stored; headlines are built from the consultation rows
+            connection.execute(text(
+                "CREATE TABLE consultation_search ("
+                "consultation_id INTEGER PRIMARY KEY REFERENCES consultations(id) ON DELETE CASCADE, "
+                "documento tsvector NOT NULL)"
+            ))
+            connection.execute(text(
+                "CREATE INDEX ix_consultation_search_documento ON consultation_search USING gin (documento)"
+            ))
+        return True
+    except Exception as e:
+        print(f"Busca textual do PostgreSQL indisponível; usando LIKE: {str(e)}")
+        return None
+
+
+def _index_table(backend):
+    return 'consultations_fts' if backend == 'fts5' else 'consultation_search'
+
+
+def _id_column(backend):
+    return 'rowid' if backend == 'fts5' else 'consultation_id'
+
+
+def _insert_rows(connection, backend, rows):
+    if backend == 'fts5':
+        columns = ', '.join(['rowid'] + INDEXED_FIELDS)
+        values = ', '.join([':id'] + [f':{field}' for field in INDEXED_FIELDS])
+        connection.execute(text(f"INSERT INTO consultations_fts ({columns}) VALUES ({values})"), rows)
+        return
+    connection.execute(text(
+        "INSERT INTO consultation_search (consultation_id, documento) VALUES (:id, "
+        "setweight(to_tsvector('pt_unaccent', :summary), 'A') || "
+        "setweight(to_tsvector('pt_unaccent', :transcript), 'B')) "
+        "ON CONFLICT (consultation_id) DO UPDATE SET documento = excluded.documento"
+    ), [{
+        'id': row['id'],
+        'summary': ' '.join(row[field] or '' for field in SUMMARY_FIELDS),
+        'transcript': row['transcricao_completa'] or '',
+    } for row in rows])
+
+
+def _delete_rows(connection, backend, ids, old_rows=None):
+    """Remove documents from the index; `old_rows` maps id -> indexed values
+    (only needed by FTS5 tables without contentless_delete)"""
+    if not ids:
+        return
+    if backend == 'fts5' and not _fts5_delete_by_rowid:
+        columns = ', '.join(['consultations_fts', 'rowid'] + INDEXED_FIELDS)
+        values = ', '.join(["'delete'", ':id'] + [f':{field}' for field in INDEXED_FIELDS])
+        rows = [dict(old_rows[i], id=i) for i in ids if i in old_rows]
+        if rows:
+            connection.execute(text(f"INSERT INTO consultations_fts ({columns}) VALUES ({values})"), rows)
+        return
+    connection.execute(
+        text(f"DELETE FROM {_index_table(backend)} WHERE {_id_column(backend)} = :id"),
+        [{'id': i} for i in ids]
+    )
+
+
+def index_consultations(connection, backend, rows):
+    """Add rows written outside the ORM unit of work (e.g. bulk inserts) to the index.
+
+    Each row is a dict with `id` and the INDEXED_FIELDS values.
+    """
+    if backend == 'like' or not rows:
+        return
+    _insert_rows(connection, backend, [
+        dict({field: row.get(field) for field in INDEXED_FIELDS}, id=row['id']) for row in rows
+    ])
+
+
+def setup_consultation_search(engine, consultation_model, batch_size=500):
+    """Create the consultation full-text index and fill it from existing rows.
+
+    Returns the backend in use: 'fts5' (SQLite), 'tsvector' (PostgreSQL) or
+    'like' (unindexed scan when neither is available).
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == 'sqlite':
+            created, backend = _setup_sqlite(connection), 'fts5'
+        elif dialect == 'postgresql':
+            created, backend = _setup_postgresql(connection), 'tsvector'
+        else:
+            created = None
+        if created is None:
+            return 'like'
+        if created:
+            # Read through the model's columns so column types decode the values
+            table = consultation_model.__table__
+            query = select(table.c.id, *[table.c[field] for field in INDEXED_FIELDS]).order_by(table.c.id)
+            last_id = 0
+            while True:
+                rows = connection.execute(query.where(table.c.id > last_id).limit(batch_size)).mappings().all()
+                if not rows:
+                    break
+                _insert_rows(connection, backend, [dict(row) for row in rows])
+                last_id = rows[-1]['id']
+    return backend
+
+
+def detect_consultation_search(engine):
+    """Pick the backend of an existing consultation index without creating or filling it.
+
+    For schemas managed outside the app: returns 'like' unless a usable
+    consultations_fts (SQLite) or consultation_search (PostgreSQL) table exists.
+    """
+    global _fts5_delete_by_rowid
+    dialect = engine.dialect.name
+    with engine.connect() as connection:
+        if dialect == 'sqlite':
+            sql = connection.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultations_fts'"
+            )).scalar()
+            if not sql:
+                return 'like'
+            # Tables that keep their content accept DELETE by rowid too
+            _fts5_delete_by_rowid = 'contentless_delete' in sql or "content=''" not in sql
+            return 'fts5'
+        if dialect == 'postgresql':
+            columns = {row[0] for row in connection.execute(text(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'consultation_search'"
+            ))}
+            # Only the tsvector-only layout created by setup_consultation_search is written to
+            if columns == {'consultation_id', 'documento'}:
+                return 'tsvector'
+    return 'like'
+
+
+def _indexed_values(connection, consultation_model, ids):
+    """Current indexed column values of the given consultations, by id"""
+    if not ids:
+        return {}
+    table = consultation_model.__table__
+    rows = connection.execute(
+        select(table.c.id, *[table.c[field] for field in INDEXED_FIELDS]).where(table.c.id.in_(ids))
+    ).mappings()
+    return {row['id']: {field: row[field] for field in INDEXED_FIELDS} for row in rows}
+
+
+def install_consultation_search_sync(consultation_model, backend):
+    """Keep the full-text index in step with every ORM flush of consultations"""
+    global _sync_installed
+    if backend == 'like' or _sync_installed:
+        return
+    _sync_installed = True
+
+    def changed_ids(session):
+        """Ids of consultations whose indexed columns are about to change or be deleted"""
+        ids = []
+        for obj in session.dirty:
+            if isinstance(obj, consultation_model):
+                state = inspect(obj)
+                if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+                    ids.append(obj.id)
+        ids += [obj.id for obj in session.deleted if isinstance(obj, consultation_model)]
+        return ids
+
+    @event.listens_for(Session, 'before_flush')
+    def capture_indexed_values(session, flush_context, instances):
+        # The index stores no text, so removing a document from an FTS5 table
+        # without contentless_delete needs the values it was indexed with
+        if backend == 'fts5' and not _fts5_delete_by_rowid:
+            session.info['consultation_index_old'] = _indexed_values(
+                session.connection(), consultation_model, changed_ids(session)
+            )
+
+    @event.listens_for(Session, 'after_flush')
+    def sync_consultation_index(session, flush_context):
+        connection = session.connection()
+        old_rows = session.info.pop('consultation_index_old', None)
+        new = [obj for obj in session.new if isinstance(obj, consultation_model)]
+        updated = []
+        for obj in session.dirty:
+            if isinstance(obj, consultation_model):
+                state = inspect(obj)
+                if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+                    updated.append(obj)
+        deleted = [obj.id for obj in session.deleted if isinstance(obj, consultation_model)]
+
+        # Changed documents are re-indexed whole, with their flushed values read back
+        updated_ids = [obj.id for obj in updated]
+        _delete_rows(connection, backend, updated_ids + deleted, old_rows)
+        rows = [dict({field: getattr(obj, field) for field in INDEXED_FIELDS}, id=obj.id) for obj in new]
+        rows += [dict(values, id=i) for i, values in _indexed_values(connection, consultation_model, updated_ids).items()]
+        if rows:
+            _insert_rows(connection, backend, rows)
+
+
+# Accented forms of each letter, so folded query terms match the original text
+_ACCENTED = {'a': 'aáàâãä', 'e': 'eéèêë', 'i': 'iíìîï', 'o': 'oóòôõö', 'u': 'uúùûü', 'c': 'cç', 'n': 'nñ'}
+
+
+def _term_pattern(terms):
+    """Regex matching words that start with any of the (accent-folded) terms"""
+    alternatives = [''.join(f'[{_ACCENTED[ch]}]' if ch in _ACCENTED else ch for ch in term) for term in terms]
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + r')\w*', re.IGNORECASE)
+
+
+def make_snippet(values, terms, size=SNIPPET_WORDS):
+    """Window of about `size` words with the most matches across `values`, matches wrapped in **.
+
+    A word matches when it starts with a query term, ignoring case and
+    accents as the index does. Only the text around the chosen window is
+    tokenized. Returns '' when no value contains a match.
+    """
+    pattern = _term_pattern(terms)
+    span = size * 7  # characters in a window, for ~6-letter Portuguese words
+    best = None
+    for value in values:
+        if not value:
+            continue
+        hits = [m.start() for m in pattern.finditer(value)]
+        for i, position in enumerate(hits):
+            score = sum(1 for other in hits[i:] if other < position + span)
+            if best is None or score > best[0]:
+                best = (score, value, position)
+    if best is None:
+        return ''
+    _, value, position = best
+
+    # Start two words before the first match, or earlier near the end of the text
+    region_start = max(0, position - size * 20)
+    words = [(m.start() + region_start, m.end() + region_start)
+             for m in _WORD.finditer(value[region_start:position + size * 20])]
+    first = next(i for i, (word_start, _) in enumerate(words) if word_start >= position)
+    start = max(0, min(first - 2, len(words) - size))
+    words = words[start:start + size]
+    matched = {m.start() for m in pattern.finditer(value, words[0][0], words[-1][1])}
+    parts = []
+    cursor = words[0][0]
+    for word_start, word_end in words:
+        parts.append(value[cursor:word_start])
+        word = value[word_start:word_end]
+        parts.append(f'**{word}**' if word_start in matched else word)
+        cursor = word_end
+    before = _WORD.search(value[:words[0][0]]) is not None
+    after = _WORD.search(value, words[-1][1]) is not None
+    return ('…' if before else '') + ''.join(parts) + ('…' if after else '')
+
+
+def _with_snippets(db, consultation_model, ranked, terms):
+    """Add snippets to the ranked (id, data_consulta) page, decoding only those rows"""
+    Consultation = consultation_model
+    ids = [row[0] for row in ranked]
+    if not ids:
+        return []
+    values = {
+        row.id: row for row in db.execute(
+            select(Consultation.id, *[getattr(Consultation, field) for field in INDEXED_FIELDS])
+            .where(Consultation.id.in_(ids))
+        )
+    }
+    return [
+        (consultation_id, data_consulta,
+         make_snippet([getattr(values[consultation_id], field) for field in INDEXED_FIELDS], terms))
+        for consultation_id, data_consulta in ranked
+    ]
+
+
+def _filters(consultation_model, patient_id, date_from, date_to):
+    conditions = []
+    if patient_id is not None:
+        conditions.append(consultation_model.patient_id == patient_id)
+    if date_from is not None:
+        conditions.append(consultation_model.data_consulta >= date_from)
+    if date_to is not None:
+        conditions.append(consultation_model.data_consulta < date_to)
+    return conditions
+
+
+def search_consultation_ids(db, backend, consultation_model, query, patient_id=None,
+                            date_from=None, date_to=None, limit=20):
+    """Return [(consultation_id, data_consulta, snippet)] for consultations matching every query term, best first"""
+    terms = normalize_name(query).split()
+    if not terms:
+        return []
+    Consultation = consultation_model
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        statement = (
+            select(Consultation.id, Consultation.data_consulta)
+            .select_from(_FTS5_TABLE.join(Consultation, Consultation.id == _FTS5_TABLE.c.rowid))
+            .where(text("consultations_fts MATCH :match"),
+                   *_filters(Consultation, patient_id, date_from, date_to))
+            .order_by(text(f"bm25(consultations_fts, {_FTS5_WEIGHTS})"))
+            .limit(limit)
+        )
+        return _with_snippets(db, Consultation, db.execute(statement, {'match': match}).all(), terms)
+
+    if backend == 'tsvector':
+        # Terms are [a-z0-9] only, so they are safe inside to_tsquery
+        params = {'tsquery': ' & '.join(f'{term}:*' for term in terms), 'limit': limit}
+        where = ["s.documento @@ q.query"]
+        for name, condition in (('patient_id', "c.patient_id = :patient_id"),
+                                ('date_from', "c.data_consulta >= :date_from"),
+                                ('date_to', "c.data_consulta < :date_to")):
+            value = {'patient_id': patient_id, 'date_from': date_from, 'date_to': date_to}[name]
+            if value is not None:
+                where.append(condition)
+                params[name] = value
+        ranked = db.execute(text(
+            "SELECT c.id, c.data_consulta FROM consultation_search s "
+            "JOIN consultations c ON c.id = s.consultation_id "
+            "CROSS JOIN to_tsquery('pt_unaccent', :tsquery) AS q(query) "
+            f"WHERE {' AND '.join(where)} ORDER BY ts_rank_cd(s.documento, q.query) DESC LIMIT :limit"
+        ), params).all()
+        # Snippets highlight prefix matches of the query terms (not stems)
+        return _with_snippets(db, Consultation, ranked, terms)
+
+    # Unindexed fallback: every term must appear in some summary field (the
+    # transcript is stored compressed and cannot be matched with LIKE)
+    conditions = _filters(Consultation, patient_id, date_from, date_to)
+    for term in terms:
+        pattern = f'%{term}%'
+        conditions.append(
+            Consultation.queixa_principal.ilike(pattern)
+            | Consultation.historia_atual.ilike(pattern)
+            | Consultation.exame_fisico.ilike(pattern)
+            | Consultation.diagnostico.ilike(pattern)
+            | Consultation.prescricoes.ilike(pattern)
+            | Consultation.observacoes.ilike(pattern)
+        )
+    rows = db.query(Consultation.id, Consultation.data_consulta, Consultation.queixa_principal).filter(*conditions).order_by(
+        Consultation.data_consulta.desc()
+    ).limit(limit).all()
+    return [(row.id, row.data_consulta, row.queixa_principal or '') for row in rows]
@@ -1,5 +1,9 @@
 import os
-from sqlalchemy import create_engine
+import json
+import hmac
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect, text, or_, and_, update, bindparam, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -13,15 +17,214 @@ Base = declarative_base()
 
 # Import models after Base is defined
 try:
-    from models import Patient, Consultation, Exam
+    from models import Patient, Consultation, Exam, ExamBlob, ImportedFile
+    from blob_store import BlobStore
+    from compressed_text import CompressedText, is_encoded, decode_text
+    from sql_profiler import attach_query_profiler
+    from render_timing import attach_sql_timing
+    from patient_cache import install_patient_cache_invalidation, get_patient_cache
+    from patient_search import setup_name_search, detect_name_search, search_patient_ids, SEARCH_TABLES as NAME_SEARCH_TABLES
+    from consultation_search import (
+        setup_consultation_search, install_consultation_search_sync, search_consultation_ids,
+        detect_consultation_search, index_consultations, SEARCH_TABLES as CONSULTATION_SEARCH_TABLES
+    )
 except ImportError:
     try:
-        from src.models import Patient, Consultation, Exam
+        from src.models import Patient, Consultation, Exam, ExamBlob, ImportedFile
+        from src.blob_store import BlobStore
+        from src.compressed_text import CompressedText, is_encoded, decode_text
+        from src.sql_profiler import attach_query_profiler
+        from src.render_timing import attach_sql_timing
+        from src.patient_cache import install_patient_cache_invalidation, get_patient_cache
+        from src.patient_search import setup_name_search, detect_name_search, search_patient_ids, SEARCH_TABLES as NAME_SEARCH_TABLES
+        from src.consultation_search import (
+            setup_consultation_search, install_consultation_search_sync, search_consultation_ids,
+            detect_consultation_search, index_consultations, SEARCH_TABLES as CONSULTATION_SEARCH_TABLES
+        )
     except ImportError:
         st.error("⚠️ Erro ao importar modelos do banco de dados")
         Patient = None
         Consultation = None
         Exam = None
+        ExamBlob = None
+        ImportedFile = None
+
+# Content-addressed storage for exam files
+exam_blobs = BlobStore(ExamBlob) if ExamBlob else None
+
+# Cached patient snapshots are dropped (and per-patient data versions bumped)
+# whenever a session commits changes to a patient or their consultations/exams
+if Patient:
+    install_patient_cache_invalidation(Patient, (Consultation, Exam))
+
+_engine = None
+_engine_lock = threading.Lock()
+_schema_ready = False
+_schema_lock = threading.Lock()
+# Name search backend chosen by init_schema/init_search: 'fts5', 'trigram' or 'btree'
+_name_search_backend = 'btree'
+# Consultation full-text backend chosen by init_schema/init_search: 'fts5', 'tsvector' or 'like'
+_consultation_search_backend = 'like'
+
+# Pool checkout counters, updated by engine pool events
+_pool_stats = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidations': 0}
+
+def _attach_pool_metrics(engine):
+    """Count pool connects/checkouts/checkins for get_pool_stats()"""
+    def counter(name):
+        def listener(*args):
+            _pool_stats[name] += 1
+        return listener
+    event.listen(engine, 'connect', counter('connects'))
+    event.listen(engine, 'checkout', counter('checkouts'))
+    event.listen(engine, 'checkin', counter('checkins'))
+    event.listen(engine, 'invalidate', counter('invalidations'))
+
+def get_engine():
+    """Return the process-wide SQLAlchemy engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    return None
+                options = {
+                    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') != '0',
+                    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                }
+                if not database_url.startswith('sqlite'):
+                    options['pool_size'] = int(os.getenv('DB_POOL_SIZE', '5'))
+                    options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+                    options['pool_timeout'] = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+                engine = create_engine(database_url, **options)
+                _attach_pool_metrics(engine)
+                attach_query_profiler(engine)
+                attach_sql_timing(engine)
+                _engine = engine
+    return _engine
+
+def _upgrade_schema(engine):
+    """Add columns and indexes introduced after a table was first created"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+def _legacy_text_columns(engine):
+    """CompressedText columns still stored as text (PostgreSQL tables created before compression)"""
+    if engine.dialect.name != 'postgresql':
+        return []
+    inspector = inspect(engine)
+    columns = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if (isinstance(column.type, CompressedText) and column.name in existing
+                    and not isinstance(existing[column.name], LargeBinary)):
+                columns.append(column)
+    return columns
+
+def _use_legacy_text_columns(engine):
+    """Keep writing plain text to columns migrate_compression.py has not converted yet.
+
+    Changing the column type rewrites the whole table under an exclusive
+    lock, so it is never done implicitly at startup.
+    """
+    columns = _legacy_text_columns(engine)
+    for column in columns:
+        column.type.store_plain_text()
+    if columns:
+        print(f"{len(columns)} colunas ainda sem compressão; execute src/migrate_compression.py")
+
+def convert_compressed_columns(engine):
+    """Change legacy text columns to bytea so they can hold compressed values.
+
+    Each ALTER rewrites its table under an ACCESS EXCLUSIVE lock; only the
+    migrate_compression.py command calls this. Rows keep their text (as
+    UTF-8 bytes) until migrate_compressed_columns rewrites them. Returns the
+    number of columns converted.
+    """
+    columns = _legacy_text_columns(engine)
+    with engine.begin() as connection:
+        for column in columns:
+            connection.execute(text(
+                f"ALTER TABLE {column.table.name} ALTER COLUMN {column.name} TYPE bytea "
+                f"USING convert_to({column.name}, 'UTF8')"
+            ))
+    for column in columns:
+        column.type.store_plain_text(False)
+    return len(columns)
+
+def init_schema():
+    """Create missing tables, columns and indexes once per process"""
+    global _schema_ready, _name_search_backend, _consultation_search_backend
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            engine = get_engine()
+            Base.metadata.create_all(bind=engine)
+            _upgrade_schema(engine)
+            _use_legacy_text_columns(engine)
+            _name_search_backend = setup_name_search(engine)
+            _consultation_search_backend = setup_consultation_search(engine, Consultation)
+            install_consultation_search_sync(Consultation, _consultation_search_backend)
+            _schema_ready = True
+
+def init_search():
+    """Use the search indexes of a schema managed outside the app (DB_CREATE_SCHEMA=0).
+
+    No index is created or filled (only missing normalized names are set);
+    the backends are picked from the indexes that exist and consultation
+    changes are kept in sync with them.
+    """
+    global _schema_ready, _name_search_backend, _consultation_search_backend
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            engine = get_engine()
+            _use_legacy_text_columns(engine)
+            _name_search_backend = detect_name_search(engine)
+            _consultation_search_backend = detect_consultation_search(engine)
+            install_consultation_search_sync(Consultation, _consultation_search_backend)
+            _schema_ready = True
+
+def reset_schema():
+    """Drop every table (including the search indexes) and create them again"""
+    global _schema_ready
+    engine = get_engine()
+    with _schema_lock:
+        with engine.begin() as connection:
+            for table_name in NAME_SEARCH_TABLES + CONSULTATION_SEARCH_TABLES:
+                connection.execute(text(f'DROP TABLE IF EXISTS {table_name}'))
+        Base.metadata.drop_all(bind=engine)
+        _schema_ready = False
+    get_patient_cache().clear()
+    init_schema()
+
+def get_pool_stats():
+    """Return connection pool checkout counters and current pool state"""
+    engine = get_engine()
+    stats = dict(_pool_stats)
+    if engine is not None:
+        pool = engine.pool
+        stats['status'] = pool.status()
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+    return stats
 
 def init_database():
     """Initialize database connection"""
@@ -40,58 +243,262 @@ DATABASE_URL = "sua-url-do-banco-de-dados"
         return None
     
     try:
-        # Create SQLAlchemy engine
-        engine = create_engine(database_url)
-        
-        # Create session factory
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Create session factory on the shared engine; loaded attributes stay
+        # usable after the session is closed
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=get_engine())
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables (disable with DB_CREATE_SCHEMA=0 when the schema is managed
+        # separately); the search backends are picked either way
+        if os.getenv('DB_CREATE_SCHEMA', '1') != '0':
+            init_schema()
+        else:
+            init_search()
         
         return SessionLocal
     except Exception as e:
         st.error(f"⚠️ Erro ao conectar ao banco de dados: {str(e)}")
         return None
 
-# Initialize session factory
-SessionLocal = init_database()
+_session_factory = None
+_session_factory_lock = threading.Lock()
+
+def get_session_factory():
+    """Return the session factory, connecting and creating the schema on first use.
+
+    Returns None (and shows the configuration error) while the database is not
+    configured or reachable; the next call tries again.
+    """
+    global _session_factory
+    if _session_factory is None:
+        with _session_factory_lock:
+            if _session_factory is None:
+                _session_factory = init_database()
+    return _session_factory
+
+@contextmanager
+def session_scope():
+    """Yield a session that is always closed (and its connection returned to the pool)"""
+    SessionLocal = get_session_factory()
+    if not SessionLocal:
+        yield None
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 def verify_login(username, password):
     """Verify user login credentials"""
-    if not SessionLocal:
+    if not get_session_factory():
         return False
     return bool(username and password)
 
-def get_patient_consultations(db, patient_id):
-    """Get all consultations for a patient"""
+def verify_admin(username, password):
+    """Whether the credentials pass verify_login and match an admin account.
+
+    Admins are the users listed in ADMIN_USERS (comma-separated) and share
+    the ADMIN_PASSWORD secret; with no ADMIN_PASSWORD nobody is an admin.
+    """
+    admins = {name.strip() for name in os.getenv('ADMIN_USERS', '').split(',') if name.strip()}
+    admin_password = os.getenv('ADMIN_PASSWORD', '')
+    if not admin_password or username not in admins or not verify_login(username, password):
+        return False
+    return hmac.compare_digest(password.encode('utf-8'), admin_password.encode('utf-8'))
+
+def search_patients(db, query, limit=20):
+    """Search patients by accent-insensitive name word prefixes, best match first"""
     if not db:
         return []
-    return db.query(Consultation).filter(Consultation.patient_id == patient_id).all()
+    ids = search_patient_ids(db, _name_search_backend, query, limit)
+    if not ids:
+        return []
+    patients = {patient.id: patient for patient in db.query(Patient).filter(Patient.id.in_(ids))}
+    return [patients[patient_id] for patient_id in ids if patient_id in patients]
+
+def search_consultations(db, query, patient_id=None, date_from=None, date_to=None, limit=20):
+    """Full-text search over transcripts and summaries.
 
-def get_patient_exams(db, patient_id):
-    """Get all exams for a patient"""
+    Returns [(consultation_id, data_consulta, snippet)] best match first;
+    matched terms are wrapped in ** in the snippet. date_to is exclusive.
+    """
     if not db:
         return []
-    return db.query(Exam).filter(Exam.patient_id == patient_id).all()
+    return search_consultation_ids(db, _consultation_search_backend, Consultation, query,
+                                   patient_id, date_from, date_to, limit)
+
+def index_bulk_consultations(db, rows):
+    """Add consultations inserted in bulk (bypassing ORM flush events) to the search index"""
+    index_consultations(db.connection(), _consultation_search_backend, rows)
+
+def _keyset_page(query, date_column, id_column, limit, cursor):
+    """Return (rows, next_cursor) for a newest-first page after `cursor`.
+
+    The cursor is the (date, id) of the last row of the previous page, so each
+    page is an index range scan regardless of how deep it is.
+    """
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(or_(
+            date_column < cursor_date,
+            and_(date_column == cursor_date, id_column < cursor_id)
+        ))
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (getattr(last, date_column.key), getattr(last, id_column.key))
+
+def _consultation_summaries_query(db, patient_id):
+    return db.query(
+        Consultation.id,
+        Consultation.data_consulta,
+        Consultation.queixa_principal,
+        Consultation.historia_atual,
+        Consultation.exame_fisico,
+        Consultation.diagnostico,
+        Consultation.prescricoes,
+        Consultation.observacoes
+    ).filter(Consultation.patient_id == patient_id)
+
+def get_patient_consultations_page(db, patient_id, limit=20, cursor=None):
+    """Get one page of consultation summaries; returns (rows, next_cursor)"""
+    if not db:
+        return [], None
+    return _keyset_page(_consultation_summaries_query(db, patient_id),
+                        Consultation.data_consulta, Consultation.id, limit, cursor)
+
+def get_consultation_export(db, consultation_id):
+    """Load the heavy columns of one consultation as its JSON export dict"""
+    if not db:
+        return None
+    consultation = db.query(
+        Consultation.data_consulta,
+        Consultation.transcricao_completa,
+        Consultation.resumo_clinico,
+        Consultation.segmentos_detalhados
+    ).filter(Consultation.id == consultation_id).first()
+    if not consultation:
+        return None
+    return {
+        'data_consulta': consultation.data_consulta.isoformat(),
+        'transcricao_completa': consultation.transcricao_completa,
+        'resumo_clinico': json.loads(consultation.resumo_clinico) if consultation.resumo_clinico else {},
+        'segmentos_detalhados': json.loads(consultation.segmentos_detalhados) if consultation.segmentos_detalhados else []
+    }
+
+def get_patient_exams_page(db, patient_id, limit=20, cursor=None):
+    """Get one page of a patient's exams; returns (exams, next_cursor)"""
+    if not db:
+        return [], None
+    return _keyset_page(db.query(Exam).filter(Exam.patient_id == patient_id),
+                        Exam.data_exame, Exam.id, limit, cursor)
 
 def create_exam(db, exam_data):
-    """Create a new exam record"""
+    """Create a new exam record, storing the file in the blob store"""
     if not db:
         return None
+    exam_data = dict(exam_data)
+    content = exam_data.pop('arquivo_pdf', None)
+    if content:
+        exam_data['arquivo_sha256'] = exam_blobs.put(db, content)
+        exam_data['arquivo_tamanho'] = len(content)
+        exam_data.setdefault('arquivo_mime', 'application/pdf')
     exam = Exam(**exam_data)
     db.add(exam)
     db.commit()
     db.refresh(exam)
     return exam
 
+def iter_exam_file(db, exam):
+    """Stream an exam's file content in chunks"""
+    if not db or not exam:
+        return iter(())
+    if exam.arquivo_sha256:
+        return exam_blobs.iter_chunks(db, exam.arquivo_sha256)
+    # Rows not yet migrated still keep the PDF inline
+    legacy = db.query(Exam.arquivo_pdf).filter(Exam.id == exam.id).scalar()
+    return iter([legacy] if legacy else [])
+
+def read_exam_file(db, exam):
+    """Load an exam's whole file content on demand.
+
+    st.download_button only takes the full content (str, bytes or a file
+    object it reads entirely), so the download holds the whole file in
+    memory; iter_exam_file only bounds the size of each database read.
+    """
+    return b''.join(iter_exam_file(db, exam))
+
 def delete_exam(db, exam_id):
-    """Delete an exam record"""
+    """Delete an exam record and its file once no other exam references it"""
     if not db:
         return False
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
     if exam:
+        sha256 = exam.arquivo_sha256
         db.delete(exam)
+        db.flush()
+        if sha256 and not db.query(Exam.id).filter(Exam.arquivo_sha256 == sha256).first():
+            exam_blobs.delete(db, sha256)
         db.commit()
         return True
     return False
+
+def migrate_exam_blobs(db, batch_size=50):
+    """Move legacy inline exam PDFs into the blob store; return rows migrated"""
+    migrated = 0
+    while True:
+        exams = db.query(Exam).filter(
+            Exam.arquivo_sha256.is_(None),
+            Exam.arquivo_pdf.isnot(None)
+        ).limit(batch_size).all()
+        if not exams:
+            return migrated
+        for exam in exams:
+            content = exam.arquivo_pdf
+            exam.arquivo_sha256 = exam_blobs.put(db, content)
+            exam.arquivo_tamanho = len(content)
+            exam.arquivo_mime = exam.arquivo_mime or 'application/pdf'
+            exam.arquivo_pdf = None
+        db.commit()
+        migrated += len(exams)
+
+def migrate_compressed_columns(db, batch_size=200, rewrite_all=False):
+    """Rewrite consultations whose heavy columns are still stored as plain text.
+
+    With rewrite_all, every row is re-encoded with the current TEXT_COMPRESSION
+    method. Returns the number of rows rewritten.
+    """
+    table = Consultation.__table__
+    columns = [column for column in table.columns if isinstance(column.type, CompressedText)]
+    names = ', '.join(column.name for column in columns)
+    statement = update(table).where(table.c.id == bindparam('row_id')).values(
+        {column.name: bindparam(f'{column.name}_value', type_=column.type) for column in columns}
+    )
+    rewritten = 0
+    last_id = 0
+    while True:
+        # Raw values (no type processing) tell legacy text apart from encoded bytes
+        rows = db.execute(
+            text(f"SELECT id, {names} FROM {table.name} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': batch_size}
+        ).all()
+        if not rows:
+            return rewritten
+        last_id = rows[-1][0]
+        pending = [
+            row for row in rows
+            if rewrite_all or any(value is not None and not is_encoded(value) for value in row[1:])
+        ]
+        if pending:
+            db.execute(statement, [
+                dict({f'{column.name}_value': decode_text(value) for column, value in zip(columns, row[1:])},
+                     row_id=row[0])
+                for row in pending
+            ])
+            db.commit()
+            rewritten += len(pending)
@@ -0,0 +1,219 @@
+"""Import consultation JSON records from data/transcriptions into the database.
+
+Files are streamed from the directory, parsed (optionally across processes),
+validated against the Consultation columns and inserted in bulk, one
+transaction per batch. Each imported file is recorded by the SHA-256 of its
+content, so re-running the import skips files already loaded.
+
+Usage:
+    python src/import_transcriptions.py [--dir data/transcriptions] [--batch-size 1000] [--workers 4]
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert
+try:
+    from database import get_session_factory, init_schema, index_bulk_consultations, Consultation, Patient, ImportedFile
+except ImportError:
+    from src.database import get_session_factory, init_schema, index_bulk_consultations, Consultation, Patient, ImportedFile
+
+DEFAULT_DIR = os.path.join('data', 'transcriptions')
+
+# consulta_<patient>_<YYYYmmdd>_<HHMMSS>.json (older files omit the patient)
+FILENAME_PATTERN = re.compile(r'^consulta_(?:(\d+)_)?(\d{8}_\d{6})\.json$')
+
+TEXT_FIELDS = [
+    'transcricao_completa',
+    'queixa_principal',
+    'historia_atual',
+    'exame_fisico',
+    'diagnostico',
+    'prescricoes',
+    'observacoes'
+]
+
+# Stored as JSON strings; records may hold them either encoded or as objects
+JSON_FIELDS = ['resumo_clinico', 'segmentos_detalhados']
+
+
+def iter_batches(directory, batch_size):
+    """Yield lists of JSON file paths without listing the whole directory up front"""
+    batch = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith('.json'):
+                batch.append(entry.path)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def parse_file(path, default_patient_id=None):
+    """Read and validate one record.
+
+    Returns (sha256, file name, consultation columns, error); columns is None
+    when the file is invalid.
+    """
+    name = os.path.basename(path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    try:
+        record = json.loads(content)
+    except ValueError as e:
+        return sha256, name, None, f'JSON inválido: {e}'
+    if not isinstance(record, dict):
+        return sha256, name, None, 'registro não é um objeto JSON'
+
+    match = FILENAME_PATTERN.match(name)
+    row = {}
+
+    patient_id = record.get('patient_id')
+    if patient_id is None and match and match.group(1):
+        patient_id = match.group(1)
+    if patient_id is None:
+        patient_id = default_patient_id
+    try:
+        row['patient_id'] = int(patient_id)
+    except (TypeError, ValueError):
+        return sha256, name, None, 'patient_id ausente ou inválido'
+
+    data_consulta = record.get('data_consulta')
+    try:
+        if data_consulta:
+            row['data_consulta'] = datetime.fromisoformat(data_consulta)
+        elif match:
+            row['data_consulta'] = datetime.strptime(match.group(2), '%Y%m%d_%H%M%S')
+        else:
+            return sha256, name, None, 'data da consulta ausente'
+    except (TypeError, ValueError):
+        return sha256, name, None, f'data_consulta inválida: {data_consulta!r}'
+
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            return sha256, name, None, f'{field} deve ser texto'
+        row[field] = value
+    if not row['transcricao_completa']:
+        return sha256, name, None, 'transcricao_completa vazia'
+
+    for field in JSON_FIELDS:
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        row[field] = value
+
+    return sha256, name, row, None
+
+
+def iter_parsed_batches(directory, batch_size, default_patient_id=None, executor=None, workers=1):
+    """Yield parsed batches; with an executor the next batch is parsed while the caller inserts the current one"""
+    if executor is None:
+        for paths in iter_batches(directory, batch_size):
+            yield [parse_file(path, default_patient_id) for path in paths]
+        return
+    previous = None
+    for paths in iter_batches(directory, batch_size):
+        chunksize = max(1, len(paths) // (workers * 4))
+        results = executor.map(parse_file, paths, repeat(default_patient_id), chunksize=chunksize)
+        if previous is not None:
+            yield list(previous)
+        previous = results
+    if previous is not None:
+        yield list(previous)
+
+
+def import_batch(db, parsed):
+    """Insert the new, valid records of one parsed batch; returns (imported, skipped, errors)"""
+    hashes = [sha256 for sha256, _, _, _ in parsed]
+    seen = {sha256 for (sha256,) in db.query(ImportedFile.sha256).filter(ImportedFile.sha256.in_(hashes))}
+
+    pending = []
+    errors = []
+    skipped = 0
+    for sha256, name, row, error in parsed:
+        if sha256 in seen:
+            skipped += 1
+            continue
+        seen.add(sha256)
+        if error:
+            errors.append((name, error))
+            continue
+        pending.append((sha256, name, row))
+
+    # Records must point at an existing patient
+    patient_ids = {row['patient_id'] for _, _, row in pending}
+    known = {patient_id for (patient_id,) in db.query(Patient.id).filter(Patient.id.in_(patient_ids))}
+    valid = []
+    for sha256, name, row in pending:
+        if row['patient_id'] in known:
+            valid.append((sha256, name, row))
+        else:
+            errors.append((name, f"paciente {row['patient_id']} não encontrado"))
+
+    if valid:
+        rows = [row for _, _, row in valid]
+        ids = db.scalars(
+            insert(Consultation).returning(Consultation.id, sort_by_parameter_order=True), rows
+        ).all()
+        index_bulk_consultations(db, [dict(row, id=consultation_id) for row, consultation_id in zip(rows, ids)])
+        now = datetime.now()
+        db.execute(insert(ImportedFile), [
+            {'sha256': sha256, 'nome_arquivo': name, 'consultation_id': consultation_id, 'importado_em': now}
+            for (sha256, name, _), consultation_id in zip(valid, ids)
+        ])
+    db.commit()
+    return len(valid), skipped, errors
+
+
+def import_directory(directory=DEFAULT_DIR, batch_size=1000, workers=1, default_patient_id=None):
+    """Import every new record in `directory`; returns (imported, skipped, errors)"""
+    SessionLocal = get_session_factory()
+    if not SessionLocal:
+        print("DATABASE_URL não configurado")
+        return 0, 0, []
+    init_schema()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    db = SessionLocal()
+    imported = skipped = 0
+    errors = []
+    try:
+        for parsed in iter_parsed_batches(directory, batch_size, default_patient_id, executor, workers):
+            batch_imported, batch_skipped, batch_errors = import_batch(db, parsed)
+            imported += batch_imported
+            skipped += batch_skipped
+            errors.extend(batch_errors)
+            print(f"{imported} importados, {skipped} já existentes, {len(errors)} inválidos")
+    finally:
+        db.close()
+        if executor is not None:
+            executor.shutdown()
+    return imported, skipped, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa consultas salvas em JSON para o banco de dados')
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='diretório com os arquivos consulta_*.json')
+    parser.add_argument('--batch-size', type=int, default=1000, help='arquivos por transação')
+    parser.add_argument('--workers', type=int, default=1, help='processos para leitura e validação')
+    parser.add_argument('--default-patient-id', type=int,
+                        help='paciente usado para arquivos sem patient_id')
+    args = parser.parse_args()
+
+    imported, skipped, errors = import_directory(args.dir, args.batch_size, args.workers,
+                                                 args.default_patient_id)
+    for name, error in errors:
+        print(f"  {name}: {error}")
+    print(f"Concluído: {imported} importados, {skipped} já existentes, {len(errors)} inválidos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_QUEUE_PATH = Path(__file__).resolve().parent.parent / 'data' / 'jobs' / 'jobs.db'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_COLUMNS = ('id', 'kind', 'patient_id', 'status', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at')
+
+
+def _boot_id():
+    try:
+        return Path('/proc/sys/kernel/random/boot_id').read_text().strip()
+    except OSError:
+        return ''
+
+
+def _process_owner():
+    """Identifies this process among those sharing the queue file. SQLite WAL
+    only works between processes on one host, so boot id plus pid is enough"""
+    return f"{_boot_id()}:{os.getpid()}"
+
+
+def _owner_alive(owner):
+    """Whether the process that queued a job (see _process_owner) is still running"""
+    boot_id, _, pid = (owner or '').rpartition(':')
+    if not pid.isdigit() or boot_id != _boot_id():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        pass
+    return True
+
+
+class JobQueue:
+    """Runs long tasks (summaries, exam analysis) on a bounded thread pool.
+
+    Job state — status, progress, result and error — is persisted in SQLite,
+    so any session can poll a job and results survive page reloads. The work
+    itself runs in the process that queued it, recorded as the job's owner:
+    when a queue starts, unfinished jobs whose owner has exited are marked as
+    failed, while jobs of other live processes sharing the file are left alone.
+    """
+
+    def __init__(self, path=None, max_workers=None, retention=None):
+        self.path = Path(path or os.getenv('JOB_QUEUE_PATH', DEFAULT_QUEUE_PATH))
+        self.max_workers = max_workers or int(os.getenv('JOB_QUEUE_WORKERS', '4'))
+        # Finished jobs older than this (seconds) are purged
+        self.retention = retention if retention is not None else float(os.getenv('JOB_RETENTION', str(7 * 24 * 3600)))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                patient_id INTEGER,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                dismissed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT
+            )
+        """)
+        if 'owner' not in {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_patient ON jobs (patient_id, kind, created_at)')
+        self.owner = _process_owner()
+        active = self._conn.execute(
+            'SELECT id, owner FROM jobs WHERE status IN (?, ?)', ACTIVE_STATUSES
+        ).fetchall()
+        now = time.time()
+        self._conn.executemany(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+            [(FAILED, 'Interrompido: o servidor foi reiniciado', now, job_id) + ACTIVE_STATUSES
+             for job_id, owner in active if not _owner_alive(owner)]
+        )
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def submit(self, kind, fn, *args, patient_id=None):
+        """Queue `fn(report, *args)` and return the job id.
+
+        `report(progress)` stores a JSON-serializable progress value that
+        status() returns while the job runs; fn's return value (also
+        JSON-serializable) becomes the job result.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, kind, patient_id, status, created_at, owner) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, patient_id, QUEUED, now, self.owner)
+            )
+            if self.retention:
+                self._conn.execute(
+                    'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                    (DONE, FAILED, now - self.retention)
+                )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id, kind, fn, args)
+        return job_id
+
+    def _run(self, job_id, kind, fn, args):
+        self._execute('UPDATE jobs SET status = ?, started_at = ? WHERE id = ?', (RUNNING, time.time(), job_id))
+
+        def report(progress):
+            self._execute('UPDATE jobs SET progress = ? WHERE id = ?',
+                          (json.dumps(progress, ensure_ascii=False), job_id))
+
+        try:
+            result = fn(report, *args)
+            self._execute(
+                'UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?',
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id)
+            )
+        except Exception as e:
+            print(f"Erro na tarefa {kind} {job_id}: {str(e)}")
+            self._execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                (FAILED, str(e), time.time(), job_id)
+            )
+
+    def _row_to_job(self, row):
+        job = dict(zip(_COLUMNS, row))
+        job['progress'] = json.loads(job['progress']) if job['progress'] else None
+        return job
+
+    def status(self, job_id):
+        """Return the job's state (without its result), or None if unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def result(self, job_id):
+        """Return the result of a finished job, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result FROM jobs WHERE id = ? AND status = ?', (job_id, DONE)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def list_jobs(self, patient_id, kind=None, limit=10):
+        """Jobs of a patient not yet dismissed, newest first"""
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE patient_id = ? AND dismissed = 0"
+        params = [patient_id]
+        if kind:
+            sql += ' AND kind = ?'
+            params.append(kind)
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY created_at DESC LIMIT ?', params + [limit]).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def dismiss(self, job_id):
+        """Hide a finished job from list_jobs"""
+        self._execute('UPDATE jobs SET dismissed = 1 WHERE id = ? AND status IN (?, ?)', (job_id, DONE, FAILED))
+
+    def get_stats(self):
+        """Return job counts per status and the pool size"""
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        stats = {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+        stats['workers'] = self.max_workers
+        return stats
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMStats:
+    """Thread-safe latency and retry counters for LLM calls"""
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latencies = []
+            self.calls = 0
+            self.retries = 0
+            self.errors = 0
+
+    def record(self, latency, retries, error=False):
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            if error:
+                self.errors += 1
+            self.latencies.append(latency)
+            if len(self.latencies) > self.max_samples:
+                self.latencies = self.latencies[-self.max_samples:]
+
+    def snapshot(self):
+        """Return counters and latency percentiles (in seconds)"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'calls': self.calls,
+                'retries': self.retries,
+                'errors': self.errors,
+            }
+        for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            stats[name] = latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+        return stats
+
+
+class LLMClient:
+    """Pooled keep-alive HTTP client for the OpenAI-compatible DeepInfra API"""
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=None, backoff_max=None):
+        self.pool_size = pool_size or int(os.getenv('LLM_POOL_SIZE', '10'))
+        self.connect_timeout = connect_timeout or float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = read_timeout or float(os.getenv('LLM_READ_TIMEOUT', '60'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', '3'))
+        self.backoff_base = backoff_base or float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+        self.backoff_max = backoff_max or float(os.getenv('LLM_BACKOFF_MAX', '30'))
+        self.stats = LLMStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _retry_after(self, response):
+        """Parse the Retry-After header (seconds or HTTP date), if present"""
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt, response=None):
+        """Full-jitter exponential backoff, overridden by Retry-After"""
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, url, headers, payload, stream=False):
+        """POST with timeouts and retry on 429/5xx and connection errors"""
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self.session.post(url, headers=headers, json=payload,
+                                             timeout=self.timeout, stream=stream)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    self.stats.record(time.perf_counter() - start, attempt)
+                    return response
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self.stats.record(time.perf_counter() - start, attempt, error=True)
+                    raise
+            except requests.HTTPError:
+                self.stats.record(time.perf_counter() - start, attempt, error=True)
+                raise
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                # Drain the error body so the keep-alive connection goes back to the pool
+                response.content
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+
+def iter_stream_deltas(response):
+    """Yield content deltas from an OpenAI-compatible server-sent event stream"""
+    response.encoding = 'utf-8'
+    done = False
+    for line in response.iter_lines(decode_unicode=True):
+        # Keep reading after [DONE] so the connection can be reused
+        if done or not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            done = True
+            continue
+        choices = json.loads(data).get('choices') or []
+        if choices:
+            delta = choices[0].get('delta', {}).get('content')
+            if delta:
+                yield delta
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide shared LLM client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
@@ -4,19 +4,49 @@ import time
 import streamlit as st
 from datetime import datetime
 from pathlib import Path
+try:
+    from medical_summarizer import RollingSummarizer, segment_text
+    from database import session_scope, Consultation
+except ImportError:
+    from src.medical_summarizer import RollingSummarizer, segment_text
+    from src.database import session_scope, Consultation
 
 class MedicalRecorder:
-    def __init__(self, patient_id):
+    def __init__(self, patient_id, summarizer=None):
         self.patient_id = patient_id
+        # Shared MedicalSummarizer; a new one is created per recording if omitted
+        self.summarizer = summarizer
         self.is_cloud = os.getenv('DEPLOYMENT_ENV') == 'cloud'
+        self.segments = []
+        self.rolling_summarizer = None
         
     def start_recording(self):
         if self.is_cloud:
             st.warning("Gravação de áudio não está disponível na versão cloud. Por favor, use a versão local para esta funcionalidade.")
             return False
+        self.segments = []
+        self.rolling_summarizer = RollingSummarizer(self.summarizer)
         return True
+
+    def add_segment(self, segment):
+        """Register a completed transcription segment while recording continues.
+
+        The segment is summarized in the background so that only a small
+        delta is left to process when the recording stops.
+        """
+        if not segment_text(segment):
+            return
+        self.segments.append(segment)
+        if self.rolling_summarizer:
+            self.rolling_summarizer.add_segment(segment)
         
-    def save_consultation(self):
+    def save_consultation(self, on_update=None):
+        """Finish the consultation and return its summary.
+
+        `on_update(section, content)` is forwarded to the summarizer so the
+        caller can render sections while the summary is still streaming.
+        Raises ValueError if no segment was added during the recording.
+        """
         if self.is_cloud:
             st.error("Funcionalidade não disponível na versão cloud")
             return {
@@ -25,5 +55,26 @@ class MedicalRecorder:
                 'prescricoes': 'Não disponível na versão cloud'
             }
             
-        # Rest of the code would go here for local version
-        return None
+        if not self.rolling_summarizer:
+            return None
+        if not self.segments:
+            # Nothing was transcribed: don't store an empty consultation
+            self.rolling_summarizer.finish()
+            self.rolling_summarizer = None
+            raise ValueError("Nenhum trecho foi transcrito nesta gravação; a consulta não foi salva")
+
+        summary = self.rolling_summarizer.finish(on_update)
+        self.rolling_summarizer = None
+        transcription = ' '.join(segment_text(segment) for segment in self.segments)
+
+        with session_scope() as db:
+            if db:
+                db.add(Consultation(
+                    patient_id=self.patient_id,
+                    transcricao_completa=transcription,
+                    resumo_clinico=json.dumps(summary, ensure_ascii=False),
+                    segmentos_detalhados=json.dumps(self.segments, ensure_ascii=False),
+                    **summary
+                ))
+                db.commit()
+        return summary
@@ -1,24 +1,31 @@
 import json
-import requests
 import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+try:
+    from llm_client import get_llm_client, iter_stream_deltas
+    from summary_cache import get_summary_cache, make_cache_key
+    from rate_limiter import RateLimiter
+    from single_flight import get_single_flight
+    from render_timing import timed
+except ImportError:
+    from src.llm_client import get_llm_client, iter_stream_deltas
+    from src.summary_cache import get_summary_cache, make_cache_key
+    from src.rate_limiter import RateLimiter
+    from src.single_flight import get_single_flight
+    from src.render_timing import timed
 
 # Load environment variables
 load_dotenv()
 
-class MedicalSummarizer:
-    def __init__(self):
-        self.api_key = os.getenv('DEEPINFRA_API_KEY')
-        self.headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
-        self.url = 'https://api.deepinfra.com/v1/openai/chat/completions'
+MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct"
 
-    def summarize(self, text):
-        """Generate medical summary from consultation text using LLaMA"""
-        try:
-            prompt = f"""Analise a seguinte transcrição de consulta médica e forneça um resumo estruturado:
+SYSTEM_PROMPT = "Você é um especialista em análise de consultas médicas."
+
+PROMPT_TEMPLATE = """Analise a seguinte transcrição de consulta médica e forneça um resumo estruturado:
 
             TRANSCRIÇÃO:
             {text}
@@ -33,92 +40,489 @@ class MedicalSummarizer:
 
             Mantenha a linguagem técnica e profissional."""
 
-            data = {
-                "model": "meta-llama/Meta-Llama-3.1-8B-Instruct",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Você é um especialista em análise de consultas médicas."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            }
-
-            response = requests.post(self.url, headers=self.headers, json=data)
-            response.raise_for_status()
-            
-            result = response.json()
-            summary_text = result['choices'][0]['message']['content']
-            
-            # Parse the summary text into structured format
-            summary = self._parse_summary(summary_text)
-            
+REDUCE_PROMPT_TEMPLATE = """Os resumos parciais abaixo foram gerados a partir de trechos consecutivos da mesma consulta médica.
+            Combine-os em um único resumo estruturado, sem repetir informações:
+
+            RESUMOS PARCIAIS:
+            {text}
+
+            Forneça um resumo estruturado com os seguintes campos:
+            1. Queixa Principal
+            2. História Atual
+            3. Exame Físico (se mencionado)
+            4. Diagnóstico
+            5. Prescrições
+            6. Observações (se houver)
+
+            Mantenha a linguagem técnica e profissional."""
+
+SECTION_LABELS = {
+    'queixa_principal': 'Queixa Principal',
+    'historia_atual': 'História Atual',
+    'exame_fisico': 'Exame Físico',
+    'diagnostico': 'Diagnóstico',
+    'prescricoes': 'Prescrições',
+    'observacoes': 'Observações'
+}
+
+# Rough upper bound on generated tokens, used for tokens/min accounting
+MAX_OUTPUT_TOKENS = 512
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for Portuguese text)"""
+    return len(text) // 4 + 1
+
+
+def segment_text(segment):
+    """Text of a transcription segment: a str or a dict with 'texto' ('text' is also accepted)"""
+    if isinstance(segment, dict):
+        segment = segment.get('texto') or segment.get('text') or ''
+    return segment.strip()
+
+
+def split_into_chunks(segments, token_budget):
+    """Group consecutive segment texts into chunks of at most `token_budget` tokens.
+
+    Segment boundaries are never split; a single oversized segment becomes its
+    own chunk.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        text = segment_text(segment)
+        if not text:
+            continue
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(' '.join(current))
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def format_partial_summaries(summaries):
+    """Render partial summaries as numbered text blocks for the reduce prompt"""
+    blocks = []
+    for i, summary in enumerate(summaries, 1):
+        lines = [f"Resumo parcial {i}:"]
+        for section, label in SECTION_LABELS.items():
+            if summary.get(section) and summary[section] != 'Não identificado':
+                lines.append(f"{label}: {summary[section]}")
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+class MedicalSummarizer:
+    def __init__(self, client=None, cache=None, max_concurrency=None):
+        self.api_key = os.getenv('DEEPINFRA_API_KEY')
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}'
+        }
+        self.url = os.getenv('DEEPINFRA_API_URL', 'https://api.deepinfra.com/v1/openai/chat/completions')
+        self.client = client or get_llm_client()
+        self.cache = cache
+        if self.cache is None and os.getenv('SUMMARY_CACHE_ENABLED', '1') != '0':
+            try:
+                self.cache = get_summary_cache()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Summary cache unavailable: {str(e)}")
+        requests_per_minute = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0'))
+        tokens_per_minute = int(os.getenv('LLM_TOKENS_PER_MINUTE', '0'))
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+        # Every upstream call (map, reduce, batch items, nested or not) takes a
+        # slot, so at most max_concurrency requests are in flight per summarizer
+        # and never more than the client's keep-alive pool holds
+        pool_size = getattr(self.client, 'pool_size', None)
+        self._llm_slots = threading.BoundedSemaphore(min(self.max_concurrency, pool_size or self.max_concurrency))
+        self.chunk_tokens = int(os.getenv('LLM_CHUNK_TOKENS', '3000'))
+        self.single_flight = get_single_flight()
+
+    def get_stats(self):
+        """Return LLM latency/retry stats, coalesced calls and cache hit/miss counters"""
+        stats = self.client.stats.snapshot()
+        stats['single_flight'] = self.single_flight.get_stats()
+        if self.cache:
+            stats['cache'] = self.cache.get_stats()
+        return stats
+
+    @timed('summarize')
+    def summarize(self, text, on_update=None, prompt_template=PROMPT_TEMPLATE, raise_errors=False):
+        """Generate medical summary from consultation text using LLaMA.
+
+        If `on_update` is given the response is streamed and the callback is
+        called with (section, content) as soon as each section has content.
+        A failed call returns the fallback summary, or raises with `raise_errors`
+        (the fallback can't be told apart from a summary with no sections found).
+        """
+        try:
+            cache_key = make_cache_key(text, MODEL, prompt_template)
+            if self.cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    if on_update:
+                        for section, content in cached.items():
+                            on_update(section, content)
+                    return cached
+
+            # Identical concurrent requests share a single upstream call
+            summary, coalesced = self.single_flight.do(
+                cache_key, lambda: self._generate(text, cache_key, on_update, prompt_template)
+            )
+            if coalesced:
+                summary = dict(summary)
+                if on_update:
+                    for section, content in summary.items():
+                        on_update(section, content)
             return summary
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error generating summary: {str(e)}")
-            return {
-                'queixa_principal': 'Não identificado',
-                'historia_atual': 'Não identificado',
-                'exame_fisico': '',
-                'diagnostico': 'Não identificado',
-                'prescricoes': 'Não identificado',
-                'observacoes': ''
-            }
+            return self._fallback_summary()
 
-    def _parse_summary(self, summary_text):
-        """Parse the LLaMA response into structured format"""
-        sections = {
-            'queixa_principal': '',
-            'historia_atual': '',
+    def _generate(self, text, cache_key, on_update, prompt_template):
+        """Call the LLM, parse the response and store it in the cache"""
+        payload = self._build_payload(text, prompt_template)
+        with self._llm_slots:
+            self.rate_limiter.acquire(estimate_tokens(payload['messages'][1]['content']) + MAX_OUTPUT_TOKENS)
+
+            if on_update:
+                summary = self._summarize_stream(payload, on_update)
+            else:
+                response = self.client.post(self.url, self.headers, payload)
+
+                result = response.json()
+                summary_text = result['choices'][0]['message']['content']
+
+                # Parse the summary text into structured format
+                summary = self._parse_summary(summary_text)
+
+        if self.cache:
+            self.cache.set(cache_key, summary)
+        
+        return summary
+
+    def _summarize_stream(self, payload, on_update):
+        """Stream the completion and parse sections incrementally"""
+        parser = SummaryStreamParser()
+        response = self.client.post(self.url, self.headers, dict(payload, stream=True), stream=True)
+        with response:
+            for delta in iter_stream_deltas(response):
+                for section, content in parser.feed(delta):
+                    on_update(section, content)
+        summary = parser.finish()
+        for section, content in summary.items():
+            on_update(section, content)
+        return summary
+
+    def summarize_many(self, texts, max_concurrency=None, prompt_template=PROMPT_TEMPLATE, raise_errors=False):
+        """Summarize many transcriptions concurrently, preserving input order.
+
+        Each item is isolated: a failure yields the fallback summary for that
+        item only (with `raise_errors`, the first failure is raised instead). Calls share the summarizer's requests/tokens per minute
+        limits and its max_concurrency in-flight requests; `max_concurrency`
+        only bounds this call's worker threads.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        workers = min(max_concurrency or self.max_concurrency, len(texts))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda text: self.summarize(text, prompt_template=prompt_template, raise_errors=raise_errors),
+                texts
+            ))
+
+    def summarize_long(self, text, segments=None, on_update=None, raise_errors=False):
+        """Summarize a consultation of any length within the token budget.
+
+        Short transcriptions go through `summarize`. Longer ones are split on
+        segment boundaries (`segmentos_detalhados` entries or sentences), the
+        chunks are summarized concurrently and merged with a reduce call. If
+        any call fails the consultation fails as a whole (fallback summary, or
+        the error with `raise_errors`) rather than merging part of it.
+        """
+        if estimate_tokens(text) <= self.chunk_tokens:
+            return self.summarize(text, on_update=on_update, raise_errors=raise_errors)
+
+        if not segments:
+            segments = re.split(r'(?<=[.!?])\s+', text)
+        chunks = split_into_chunks(segments, self.chunk_tokens)
+        try:
+            partials = self.summarize_many(chunks, raise_errors=True)
+            return self._reduce(partials, on_update, raise_errors=True)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error generating summary: {str(e)}")
+            return self._fallback_summary()
+
+    def summarize_many_long(self, consultations, max_concurrency=None):
+        """summarize_many for (text, segments) pairs, each going through summarize_long.
+
+        Failed items are None, so callers can leave them for a later retry.
+        """
+        consultations = list(consultations)
+        if not consultations:
+            return []
+
+        def summarize_item(item):
+            try:
+                return self.summarize_long(*item, raise_errors=True)
+            except Exception as e:
+                print(f"Error generating summary: {str(e)}")
+                return None
+
+        workers = min(max_concurrency or self.max_concurrency, len(consultations))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(summarize_item, consultations))
+
+    @timed('summarize.reduce')
+    def _reduce(self, partials, on_update=None, raise_errors=False):
+        """Merge partial summaries, reducing in groups if they exceed the budget.
+
+        `partials` must all be real summaries; callers drop the merge when a
+        partial failed, since it would silently lose part of the consultation.
+        """
+        if not partials:
+            return self._fallback_summary()
+        if len(partials) == 1:
+            if on_update:
+                for section, content in partials[0].items():
+                    on_update(section, content)
+            return partials[0]
+
+        groups = [[]]
+        group_tokens = 0
+        for partial in partials:
+            tokens = estimate_tokens(format_partial_summaries([partial]))
+            if groups[-1] and group_tokens + tokens > self.chunk_tokens:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(partial)
+            group_tokens += tokens
+
+        # Reduce in one call when everything fits or grouping would not shrink the input
+        if len(groups) == 1 or len(groups) == len(partials):
+            return self.summarize(format_partial_summaries(partials), on_update=on_update,
+                                  prompt_template=REDUCE_PROMPT_TEMPLATE, raise_errors=raise_errors)
+        try:
+            merged = self.summarize_many([format_partial_summaries(g) for g in groups],
+                                         prompt_template=REDUCE_PROMPT_TEMPLATE, raise_errors=True)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error generating summary: {str(e)}")
+            return self._fallback_summary()
+        return self._reduce(merged, on_update, raise_errors)
+
+    def _build_payload(self, text, prompt_template=PROMPT_TEMPLATE):
+        """Build the chat completion request body for a transcription"""
+        return {
+            "model": MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt_template.format(text=text)
+                }
+            ]
+        }
+
+    def _fallback_summary(self):
+        """Summary returned when the LLM call fails"""
+        return {
+            'queixa_principal': 'Não identificado',
+            'historia_atual': 'Não identificado',
             'exame_fisico': '',
-            'diagnostico': '',
-            'prescricoes': '',
+            'diagnostico': 'Não identificado',
+            'prescricoes': 'Não identificado',
             'observacoes': ''
         }
-        
-        current_section = None
-        lines = summary_text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            lower_line = line.lower()
-            
-            # Check for section headers
-            if 'queixa principal' in lower_line:
-                current_section = 'queixa_principal'
-                continue
-            elif 'história atual' in lower_line or 'historia atual' in lower_line:
-                current_section = 'historia_atual'
-                continue
-            elif 'exame físico' in lower_line or 'exame fisico' in lower_line:
-                current_section = 'exame_fisico'
-                continue
-            elif 'diagnóstico' in lower_line or 'diagnostico' in lower_line:
-                current_section = 'diagnostico'
-                continue
-            elif 'prescrições' in lower_line or 'prescricoes' in lower_line:
-                current_section = 'prescricoes'
-                continue
-            elif 'observações' in lower_line or 'observacoes' in lower_line:
-                current_section = 'observacoes'
-                continue
-            
-            # Add content to current section
-            if current_section and current_section in sections:
-                if sections[current_section]:
-                    sections[current_section] += ' '
-                sections[current_section] += line
-        
-        # Set default values for empty sections
-        for key in sections:
-            if not sections[key]:
+
+    def _parse_summary(self, summary_text):
+        """Parse the LLaMA response into structured format"""
+        parser = SummaryStreamParser()
+        parser.feed(summary_text)
+        return parser.finish()
+
+
+# Section header lines: the keyword at the start of the line, optionally after
+# list numbering or markdown markup (#, -, **), then either nothing else or a
+# colon followed by inline content. Matched against the lowercased line.
+HEADER_PATTERN = re.compile(
+    r'[ \t]*(?:#{1,6}[ \t]*)?(?:[-*][ \t]+)?(?:\*\*|__)?[ \t]*(?:\d+[.)][ \t]*)?(?:\*\*|__)?[ \t]*'
+    r'(queixa principal|hist[oó]ria atual|exame f[ií]sico|diagn[oó]stico|prescri[cç][oõ]es|observa[cç][oõ]es)'
+    r'(?:[ \t]*\([^)]*\))?[ \t]*(?:\*\*|__)?[ \t]*(?::[ \t]*(?:\*\*|__)?(.*)|$)'
+)
+HEADER_SECTIONS = {
+    'queixa principal': 'queixa_principal',
+    'historia atual': 'historia_atual',
+    'exame fisico': 'exame_fisico',
+    'diagnostico': 'diagnostico',
+    'prescricoes': 'prescricoes',
+    'observacoes': 'observacoes'
+}
+# First four letters of each keyword, checked before running the pattern
+HEADER_PREFIXES = frozenset(keyword[:4] for keyword in HEADER_SECTIONS)
+HEADER_MARKUP = ' \t#*-_0123456789.)'
+_UNACCENT = str.maketrans('óíçõ', 'oico')
+
+
+def parse_header_line(line):
+    """Return (section, inline content) if `line` is a section header, else None.
+
+    Lines are rejected with a set lookup on the first letters after any
+    markup, so the compiled pattern only runs on likely headers. Inline
+    content is the text after the header's colon.
+    """
+    if line.lstrip(HEADER_MARKUP)[:4].lower() not in HEADER_PREFIXES:
+        return None
+    lower = line.lower()
+    if len(lower) != len(line):
+        # A few characters lowercase to several code points; keep offsets aligned
+        lower = ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in line)
+    match = HEADER_PATTERN.match(lower)
+    if not match:
+        return None
+    section = HEADER_SECTIONS[match.group(1).translate(_UNACCENT)]
+    content = line[match.start(2):match.end(2)] if match.group(2) is not None else ''
+    return section, content.strip().strip('*_').strip()
+
+
+class SummaryStreamParser:
+    """Incremental parser turning LLM token deltas into summary sections.
+
+    `feed` returns a list of (section, content) updates for the sections that
+    received completed lines, so callers can render a section as soon as its
+    header has arrived.
+    """
+
+    def __init__(self):
+        self.sections = {section: [] for section in SECTION_LABELS}
+        self.current_section = None
+        self._buffer = ''
+
+    def feed(self, delta):
+        """Consume a text delta and return section updates for completed lines"""
+        self._buffer += delta
+        end = self._buffer.rfind('\n')
+        if end == -1:
+            return []
+        block = self._buffer[:end]
+        self._buffer = self._buffer[end + 1:]
+        touched = self._feed_block(block)
+        return [(section, ' '.join(self.sections[section])) for section in touched]
+
+    def finish(self):
+        """Flush the trailing partial line and return the final sections"""
+        if self._buffer:
+            self._feed_block(self._buffer)
+            self._buffer = ''
+
+        sections = {}
+        for key, parts in self.sections.items():
+            # Set default values for empty sections
+            if parts:
+                sections[key] = ' '.join(parts)
+            else:
                 sections[key] = 'Não identificado' if key != 'exame_fisico' and key != 'observacoes' else ''
         
         return sections
+
+    def _feed_block(self, block):
+        """Process complete lines; return the sections that received content"""
+        touched = {}
+        for line in block.split('\n'):
+            header = parse_header_line(line)
+            if header:
+                self.current_section, line = header
+
+            line = line.strip()
+            # Add content to current section
+            if line and self.current_section:
+                self.sections[self.current_section].append(line)
+                touched[self.current_section] = True
+        return touched
+
+
+class RollingSummarizer:
+    """Summarizes transcription segments in the background while recording.
+
+    Segments are grouped until they reach `min_tokens` and each group is
+    summarized on a worker thread. `finish` only has to summarize the last
+    pending delta and merge the partial summaries with one reduce call.
+    """
+
+    def __init__(self, summarizer=None, min_tokens=None, max_workers=2):
+        self.summarizer = summarizer or MedicalSummarizer()
+        self.min_tokens = min_tokens or int(os.getenv('LLM_ROLLING_MIN_TOKENS', '300'))
+        self.max_workers = max_workers
+        self.executor = None
+        self.futures = []
+        self.segments = []
+        self.pending = []
+        self.pending_tokens = 0
+        self._lock = threading.Lock()
+
+    def add_segment(self, segment):
+        """Queue a completed transcription segment (see segment_text)"""
+        text = segment_text(segment)
+        if not text:
+            return
+        with self._lock:
+            self.segments.append(segment)
+            self.pending.append(text)
+            self.pending_tokens += estimate_tokens(text)
+            if self.pending_tokens >= self.min_tokens:
+                self._submit_pending()
+
+    def _submit_pending(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        chunk = ' '.join(self.pending)
+        self.pending = []
+        self.pending_tokens = 0
+        self.futures.append(self.executor.submit(self.summarizer.summarize, chunk, raise_errors=True))
+
+    def finish(self, on_update=None):
+        """Summarize the remaining delta and merge everything into one summary.
+
+        If any partial summary failed, the full transcript is summarized again
+        with summarize_long rather than merging an incomplete set. The
+        summarizer is reset afterwards and can be reused for a new recording.
+        """
+        with self._lock:
+            if self.pending:
+                self._submit_pending()
+            futures, segments, executor = self.futures, self.segments, self.executor
+            self.futures, self.segments, self.executor = [], [], None
+        partials = []
+        failed = False
+        try:
+            for future in futures:
+                try:
+                    partials.append(future.result())
+                except Exception as e:
+                    print(f"Error generating partial summary: {str(e)}")
+                    failed = True
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if failed:
+            print("Resumo parcial falhou; resumindo a transcrição completa")
+            text = ' '.join(segment_text(segment) for segment in segments)
+            return self.summarizer.summarize_long(text, segments=segments, on_update=on_update)
+        return self.summarizer._reduce(partials, on_update)
@@ -0,0 +1,58 @@
+"""Compress consultation transcripts, summaries and segments stored as plain text.
+
+Rows are rewritten in batches, each in its own transaction, so the command can
+be interrupted and re-run. On SQLite, --vacuum returns the freed space to the
+file system afterwards.
+
+On PostgreSQL, columns created as text are first changed to bytea. That
+rewrites the consultations table under an exclusive lock, so run the first
+pass in a maintenance window and restart the app afterwards; the app itself
+never changes column types.
+
+Usage:
+    python src/migrate_compression.py [--batch-size 200] [--all] [--vacuum]
+"""
+import argparse
+from sqlalchemy import text
+try:
+    from database import (
+        get_session_factory, init_schema, get_engine, convert_compressed_columns, migrate_compressed_columns
+    )
+except ImportError:
+    from src.database import (
+        get_session_factory, init_schema, get_engine, convert_compressed_columns, migrate_compressed_columns
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comprime transcrições e resumos já gravados')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--all', action='store_true',
+                        help='Recomprimir todas as linhas com o método atual (TEXT_COMPRESSION)')
+    parser.add_argument('--vacuum', action='store_true', help='Executar VACUUM ao final (SQLite)')
+    args = parser.parse_args()
+
+    SessionLocal = get_session_factory()
+    if not SessionLocal:
+        print("DATABASE_URL não configurado")
+        return
+    init_schema()
+    converted = convert_compressed_columns(get_engine())
+    if converted:
+        print(f"{converted} colunas convertidas para bytea")
+    db = SessionLocal()
+    try:
+        rewritten = migrate_compressed_columns(db, args.batch_size, args.all)
+    finally:
+        db.close()
+    print(f"{rewritten} consultas comprimidas")
+
+    engine = get_engine()
+    if args.vacuum and engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+        print("VACUUM concluído")
+
+
+if __name__ == '__main__':
+    main()
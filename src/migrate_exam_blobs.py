@@ -0,0 +1,32 @@
+"""Move exam PDFs stored inline in `exams.arquivo_pdf` into the blob store.
+
+Usage:
+    python src/migrate_exam_blobs.py [--batch-size 50]
+"""
+import argparse
+try:
+    from database import get_session_factory, init_schema, migrate_exam_blobs
+except ImportError:
+    from src.database import get_session_factory, init_schema, migrate_exam_blobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra PDFs de exames para o armazenamento de arquivos')
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    SessionLocal = get_session_factory()
+    if not SessionLocal:
+        print("DATABASE_URL não configurado")
+        return
+    init_schema()
+    db = SessionLocal()
+    try:
+        migrated = migrate_exam_blobs(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"{migrated} exames migrados")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, LargeBinary, Index
+from sqlalchemy.orm import relationship, deferred, validates
 from database import Base
+try:
+    from patient_search import normalize_name
+    from compressed_text import CompressedText
+except ImportError:
+    from src.patient_search import normalize_name
+    from src.compressed_text import CompressedText
 from datetime import datetime
 
 class Patient(Base):
@@ -8,6 +14,8 @@ class Patient(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
+    # Lowercased, accent-folded copy of nome used by the name search index
+    nome_normalizado = Column(String(100), index=True)
     cpf = Column(String(11), unique=True, nullable=False)
     data_nascimento = Column(String(10), nullable=False)
     sexo = Column(String(10), nullable=False)
@@ -18,6 +26,11 @@ class Patient(Base):
     consultations = relationship("Consultation", back_populates="patient")
     exams = relationship("Exam", back_populates="patient")
 
+    @validates('nome')
+    def _sync_nome_normalizado(self, key, nome):
+        self.nome_normalizado = normalize_name(nome)
+        return nome
+
 class Consultation(Base):
     __tablename__ = "consultations"
 
@@ -30,12 +43,18 @@ class Consultation(Base):
     diagnostico = Column(Text)
     prescricoes = Column(Text)
     observacoes = Column(Text)
-    transcricao_completa = Column(Text)
-    resumo_clinico = Column(Text)
-    segmentos_detalhados = Column(Text)
+    # Heavy columns are stored compressed and only loaded when accessed
+    transcricao_completa = deferred(Column(CompressedText))
+    resumo_clinico = deferred(Column(CompressedText))
+    segmentos_detalhados = deferred(Column(CompressedText))
     
     patient = relationship("Patient", back_populates="consultations")
 
+    __table_args__ = (
+        # Backs per-patient history ordered by date (keyset pagination)
+        Index('ix_consultations_patient_data', 'patient_id', 'data_consulta', 'id'),
+    )
+
 class Exam(Base):
     __tablename__ = "exams"
 
@@ -43,7 +62,34 @@ class Exam(Base):
     patient_id = Column(Integer, ForeignKey("patients.id"))
     data_exame = Column(DateTime, default=datetime.now)
     tipo_exame = Column(String(100))
-    arquivo_pdf = Column(LargeBinary)
+    # File content lives in exam_blobs; the row only references it
+    arquivo_sha256 = Column(String(64), index=True)
+    arquivo_tamanho = Column(Integer)
+    arquivo_mime = Column(String(100))
+    # Legacy inline PDF, emptied by migrate_exam_blobs.py; never loaded eagerly
+    arquivo_pdf = deferred(Column(LargeBinary))
     analise = Column(Text)
     
     patient = relationship("Patient", back_populates="exams")
+
+    __table_args__ = (
+        Index('ix_exams_patient_data', 'patient_id', 'data_exame', 'id'),
+    )
+
+class ExamBlob(Base):
+    __tablename__ = "exam_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    tamanho = Column(Integer, nullable=False)
+    compressao = Column(String(10), nullable=False, default='none')
+    dados = Column(LargeBinary, nullable=False)
+    criado_em = Column(DateTime, default=datetime.now)
+
+class ImportedFile(Base):
+    __tablename__ = "imported_files"
+
+    # SHA-256 of the file content, so renamed or re-copied files are not imported twice
+    sha256 = Column(String(64), primary_key=True)
+    nome_arquivo = Column(String(255), nullable=False)
+    consultation_id = Column(Integer, ForeignKey("consultations.id"))
+    importado_em = Column(DateTime, default=datetime.now)
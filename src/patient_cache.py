@@ -0,0 +1,216 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Load environment variables
+load_dotenv()
+
+
+class PatientSnapshot(NamedTuple):
+    """Immutable copy of a patient row, safe to share across sessions and threads"""
+    id: int
+    nome: str
+    cpf: str
+    data_nascimento: str
+    sexo: str
+    telefone: str
+    email: Optional[str]
+    endereco: Optional[str]
+
+    @classmethod
+    def from_model(cls, patient):
+        return cls(**{field: getattr(patient, field) for field in cls._fields})
+
+
+@lru_cache(maxsize=1024)
+def format_snapshot(snapshot):
+    """Read-only display dict for a snapshot, built once per distinct snapshot"""
+    return MappingProxyType(snapshot._asdict())
+
+
+# Marks a CPF known not to be registered, so the registration screen does not
+# query the database on every rerun
+_NOT_FOUND = object()
+
+
+class PatientCache:
+    """Process-wide LRU cache of patient snapshots keyed by id and by CPF.
+
+    Entries expire after PATIENT_CACHE_TTL seconds as a bound on staleness for
+    writes made by other processes; writes made through this process's ORM
+    sessions invalidate the affected keys on commit.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.getenv('PATIENT_CACHE_MAX_ENTRIES', '2048'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('PATIENT_CACHE_TTL', '300'))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; loads that raced one are not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl or time.monotonic() - entry[1] <= self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], self._generation
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            now = time.monotonic()
+            keys = [key]
+            if value is not _NOT_FOUND:
+                keys = [('id', value.id), ('cpf', value.cpf)]
+            for store_key in keys:
+                self._entries[store_key] = (value, now)
+                self._entries.move_to_end(store_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _get(self, key, loader):
+        value, generation = self._lookup(key)
+        if value is None:
+            snapshot = loader()
+            value = snapshot if snapshot is not None else _NOT_FOUND
+            self._store(key, value, generation)
+        return None if value is _NOT_FOUND else value
+
+    def get_by_id(self, patient_id, loader):
+        """Return the snapshot for `patient_id`, calling `loader()` on a miss"""
+        return self._get(('id', patient_id), loader)
+
+    def get_by_cpf(self, cpf, loader):
+        """Return the snapshot for `cpf` (or None if unregistered), calling `loader()` on a miss"""
+        return self._get(('cpf', cpf), loader)
+
+    def put(self, snapshot):
+        """Cache a snapshot just read from the database"""
+        with self._lock:
+            generation = self._generation
+        self._store(('id', snapshot.id), snapshot, generation)
+
+    def invalidate(self, patient_id=None, cpf=None):
+        """Drop the entries for a patient id and/or CPF (both keys of a cached snapshot)"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            keys = {('id', patient_id), ('cpf', cpf)}
+            for key in list(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is not _NOT_FOUND:
+                    keys.update({('id', entry[0].id), ('cpf', entry[0].cpf)})
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_patient_cache = None
+_patient_cache_lock = threading.Lock()
+
+
+def get_patient_cache():
+    """Return the process-wide patient cache"""
+    global _patient_cache
+    if _patient_cache is None:
+        with _patient_cache_lock:
+            if _patient_cache is None:
+                _patient_cache = PatientCache()
+    return _patient_cache
+
+
+# Per-patient counter of committed changes to the patient or their consultations
+# and exams; UI caches include it in their keys so a change makes them miss
+_data_versions = {}
+_data_versions_lock = threading.Lock()
+
+
+def get_patient_data_version(patient_id):
+    """Current data version of a patient"""
+    with _data_versions_lock:
+        return _data_versions.get(patient_id, 0)
+
+
+def bump_patient_data_version(patient_id):
+    """Mark a patient's data as changed (done automatically for ORM commits)"""
+    with _data_versions_lock:
+        _data_versions[patient_id] = _data_versions.get(patient_id, 0) + 1
+
+
+_invalidation_installed = False
+
+
+def install_patient_cache_invalidation(patient_model, related_models=()):
+    """Invalidate cached patients changed by any ORM session once it commits.
+
+    Committed changes to the patient or to rows of `related_models` (which
+    carry a patient_id) also bump that patient's data version.
+    """
+    global _invalidation_installed
+    if _invalidation_installed:
+        return
+    _invalidation_installed = True
+
+    @event.listens_for(Session, 'after_flush')
+    def collect_changed_patients(session, flush_context):
+        changed = session.info.setdefault('changed_patients', set())
+        changed_data = session.info.setdefault('changed_patient_data', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, patient_model):
+                changed.add((obj.id, obj.cpf))
+                changed_data.add(obj.id)
+                # A CPF change must also drop the entry under the old CPF
+                for old_cpf in inspect(obj).attrs.cpf.history.deleted:
+                    changed.add((obj.id, old_cpf))
+            elif isinstance(obj, related_models):
+                changed_data.add(obj.patient_id)
+                # Rows moved to another patient change both patients' lists
+                changed_data.update(inspect(obj).attrs.patient_id.history.deleted)
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidate_changed_patients(session):
+        cache = get_patient_cache()
+        for patient_id, cpf in session.info.pop('changed_patients', ()):
+            cache.invalidate(patient_id, cpf)
+        for patient_id in session.info.pop('changed_patient_data', ()):
+            bump_patient_data_version(patient_id)
+
+    @event.listens_for(Session, 'after_rollback')
+    def discard_changed_patients(session):
+        session.info.pop('changed_patients', None)
+        session.info.pop('changed_patient_data', None)
@@ -1,57 +1,68 @@
 import streamlit as st
 from datetime import datetime
 try:
-    from database import SessionLocal, Patient, get_patient, create_patient, get_patients_by_name
+    from database import session_scope, search_patients, Patient
+    from patient_cache import PatientSnapshot, get_patient_cache, format_snapshot
 except ImportError:
     try:
-        from src.database import SessionLocal, Patient, get_patient, create_patient, get_patients_by_name
+        from src.database import session_scope, search_patients, Patient
+        from src.patient_cache import PatientSnapshot, get_patient_cache, format_snapshot
     except ImportError:
         st.error("⚠️ Erro ao importar módulos do banco de dados")
 
 class PatientManager:
-    def __init__(self):
-        self.db = SessionLocal() if SessionLocal else None
+    """Patient queries; each call uses its own short-lived session.
+
+    Patients are returned as immutable PatientSnapshot objects served from the
+    process-wide patient cache where possible.
+    """
+
+    def _load(self, condition):
+        with session_scope() as db:
+            if not db:
+                return None
+            patient = db.query(Patient).filter(condition).first()
+            return PatientSnapshot.from_model(patient) if patient else None
+
+    def get_patient(self, patient_id):
+        """Get patient by id"""
+        return get_patient_cache().get_by_id(patient_id, lambda: self._load(Patient.id == patient_id))
 
     def get_patient_by_cpf(self, cpf):
         """Get patient by CPF"""
-        if not self.db:
-            return None
-        return self.db.query(Patient).filter(Patient.cpf == cpf).first()
+        return get_patient_cache().get_by_cpf(cpf, lambda: self._load(Patient.cpf == cpf))
 
-    def search_patients_by_name(self, name):
-        """Search patients by name"""
-        if not self.db:
-            return []
-        return self.db.query(Patient).filter(Patient.nome.ilike(f"%{name}%")).all()
+    def search_patients_by_name(self, name, limit=20):
+        """Search patients by name (accent-insensitive, matches word prefixes)"""
+        with session_scope() as db:
+            if not db:
+                return []
+            snapshots = [PatientSnapshot.from_model(patient) for patient in search_patients(db, name, limit)]
+        cache = get_patient_cache()
+        for snapshot in snapshots:
+            cache.put(snapshot)
+        return snapshots
 
     def register_patient(self, patient_data):
         """Register a new patient"""
-        if not self.db:
-            st.error("⚠️ Banco de dados não está configurado")
-            return None
-        
-        try:
-            patient = Patient(**patient_data)
-            self.db.add(patient)
-            self.db.commit()
-            self.db.refresh(patient)
-            return patient
-        except Exception as e:
-            self.db.rollback()
-            raise ValueError(str(e))
+        with session_scope() as db:
+            if not db:
+                st.error("⚠️ Banco de dados não está configurado")
+                return None
+            
+            try:
+                patient = Patient(**patient_data)
+                db.add(patient)
+                db.commit()
+                # The commit already dropped any cached "not registered" entry for this CPF
+                return PatientSnapshot.from_model(patient)
+            except Exception as e:
+                db.rollback()
+                raise ValueError(str(e))
 
     def format_patient_info(self, patient):
         """Format patient info for display"""
         if not patient:
             return {}
         
-        return {
-            'id': patient.id,
-            'nome': patient.nome,
-            'cpf': patient.cpf,
-            'data_nascimento': patient.data_nascimento,
-            'sexo': patient.sexo,
-            'telefone': patient.telefone,
-            'email': patient.email,
-            'endereco': patient.endereco
-        }
+        return format_snapshot(patient)
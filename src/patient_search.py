@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from sqlalchemy import text
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+# Search structures created outside the SQLAlchemy metadata
+SEARCH_TABLES = ['patients_fts']
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and collapse punctuation/whitespace ("João  D'Ávila" -> "joao d avila")"""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', name.lower())
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', folded).strip()
+
+
+def _tokens(query):
+    return normalize_name(query).split()
+
+
+def fts5_available(connection):
+    """Whether the SQLite build includes the FTS5 extension"""
+    try:
+        connection.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)"))
+        connection.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _setup_sqlite(connection):
+    if not fts5_available(connection):
+        return False
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patients_fts'"
+    )).first()
+    if exists:
+        return True
+    # External-content index over patients.nome_normalizado, kept in sync by triggers
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE patients_fts USING fts5("
+        "nome_normalizado, content='patients', content_rowid='id', prefix='2 3')"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER patients_fts_ai AFTER INSERT ON patients BEGIN "
+        "INSERT INTO patients_fts(rowid, nome_normalizado) VALUES (new.id, new.nome_normalizado); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER patients_fts_ad AFTER DELETE ON patients BEGIN "
+        "INSERT INTO patients_fts(patients_fts, rowid, nome_normalizado) "
+        "VALUES ('delete', old.id, old.nome_normalizado); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER patients_fts_au AFTER UPDATE OF nome_normalizado ON patients BEGIN "
+        "INSERT INTO patients_fts(patients_fts, rowid, nome_normalizado) "
+        "VALUES ('delete', old.id, old.nome_normalizado); "
+        "INSERT INTO patients_fts(rowid, nome_normalizado) VALUES (new.id, new.nome_normalizado); END"
+    ))
+    connection.execute(text("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')"))
+    return True
+
+
+def _setup_postgresql(connection):
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_patients_nome_trgm "
+                "ON patients USING gin (nome_normalizado gin_trgm_ops)"
+            ))
+        return True
+    except Exception as e:
+        print(f"pg_trgm indisponível; busca por nome usará o índice B-tree: {str(e)}")
+        return False
+
+
+def _backfill_normalized_names(connection, batch_size):
+    """Fill nome_normalizado on rows written before the column existed"""
+    while True:
+        rows = connection.execute(
+            text("SELECT id, nome FROM patients WHERE nome_normalizado IS NULL LIMIT :limit"),
+            {'limit': batch_size}
+        ).all()
+        if not rows:
+            return
+        connection.execute(
+            text("UPDATE patients SET nome_normalizado = :nome_normalizado WHERE id = :id"),
+            [{'id': row.id, 'nome_normalizado': normalize_name(row.nome)} for row in rows]
+        )
+
+
+def setup_name_search(engine, batch_size=1000):
+    """Backfill normalized names and create the dialect's name search index.
+
+    Returns the search backend in use: 'fts5' (SQLite), 'trigram' (PostgreSQL)
+    or 'btree' (prefix match on the normalized column).
+    """
+    with engine.begin() as connection:
+        _backfill_normalized_names(connection, batch_size)
+        dialect = engine.dialect.name
+        if dialect == 'sqlite' and _setup_sqlite(connection):
+            return 'fts5'
+        if dialect == 'postgresql' and _setup_postgresql(connection):
+            return 'trigram'
+    return 'btree'
+
+
+def detect_name_search(engine, batch_size=1000):
+    """Backfill normalized names and pick the backend of an existing name index.
+
+    For schemas managed outside the app: no index is created, so 'btree' is
+    returned unless patients_fts (SQLite) or ix_patients_nome_trgm (PostgreSQL) exists.
+    """
+    with engine.begin() as connection:
+        _backfill_normalized_names(connection, batch_size)
+        dialect = engine.dialect.name
+        if dialect == 'sqlite' and connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patients_fts'"
+        )).first():
+            return 'fts5'
+        if dialect == 'postgresql' and connection.execute(text(
+            "SELECT to_regclass('ix_patients_nome_trgm')"
+        )).scalar():
+            return 'trigram'
+    return 'btree'
+
+
+def search_patient_ids(db, backend, query, limit=20):
+    """Return ids of patients whose name words start with every query token, best match first"""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # FTS5 keeps only the best `limit` matches while scoring, so every
+        # match is ranked without sorting the full result
+        rows = db.execute(text(
+            "SELECT rowid FROM patients_fts WHERE patients_fts MATCH :match ORDER BY rank LIMIT :limit"
+        ), {'match': match, 'limit': limit})
+        return [row[0] for row in rows]
+
+    params = {'query': ' '.join(tokens), 'limit': limit}
+    if backend == 'trigram':
+        # Tokens are [a-z0-9] only, so they are safe inside the regex
+        conditions = []
+        for i, token in enumerate(tokens):
+            conditions.append(f"nome_normalizado ~ :token{i}")
+            params[f'token{i}'] = f'(^| ){token}'
+        rows = db.execute(text(
+            f"SELECT id FROM patients WHERE {' AND '.join(conditions)} "
+            "ORDER BY word_similarity(:query, nome_normalizado) DESC, nome_normalizado LIMIT :limit"
+        ), params)
+        return [row[0] for row in rows]
+
+    # Portable fallback with the same semantics: every token must start some
+    # name word. Only names starting with the first token can use the B-tree
+    # index; the rest is a scan, so this is for databases without FTS5/pg_trgm
+    conditions = []
+    for i, token in enumerate(tokens):
+        conditions.append(f"(nome_normalizado LIKE :token{i} OR nome_normalizado LIKE :inner{i})")
+        params[f'token{i}'] = f'{token}%'
+        params[f'inner{i}'] = f'% {token}%'
+    rows = db.execute(text(
+        f"SELECT id FROM patients WHERE {' AND '.join(conditions)} "
+        "ORDER BY CASE WHEN nome_normalizado LIKE :token0 THEN 0 ELSE 1 END, nome_normalizado LIMIT :limit"
+    ), params)
+    return [row[0] for row in rows]
@@ -0,0 +1,45 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available and take them"""
+        # Requests larger than the bucket would never fit; cap them to a full bucket
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """Combined requests/min and tokens/min limiter for LLM calls"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+# Load environment variables
+load_dotenv()
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_local = threading.local()
+
+
+class RenderTrace:
+    """Timing spans of one script run, aggregated by span name"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.outcome = 'ok'
+        self.render_seconds = None
+
+    def add(self, name, elapsed):
+        entry = self.spans.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    def summary(self):
+        render_seconds = self.render_seconds or time.perf_counter() - self.started
+        spans = [
+            {'name': name, 'count': count, 'total_ms': round(total * 1000, 2), 'max_ms': round(longest * 1000, 2)}
+            for name, (count, total, longest) in self.spans.items()
+        ]
+        return {
+            'label': self.label,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'outcome': self.outcome,
+            'render_ms': round(render_seconds * 1000, 2),
+            'sql_queries': self.sql_count,
+            'sql_ms': round(self.sql_seconds * 1000, 2),
+            'spans': sorted(spans, key=lambda span: span['total_ms'], reverse=True),
+        }
+
+
+class SpanMetrics:
+    """Process-wide span histograms and render counters in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._renders = {}
+
+    def observe(self, name, elapsed):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += elapsed
+            histogram[2] += 1
+
+    def count_render(self, outcome):
+        with self._lock:
+            self._renders[outcome] = self._renders.get(outcome, 0) + 1
+
+    def prometheus_text(self):
+        lines = [
+            '# HELP app_renders_total Script runs by outcome',
+            '# TYPE app_renders_total counter',
+        ]
+        with self._lock:
+            for outcome, count in sorted(self._renders.items()):
+                lines.append(f'app_renders_total{{outcome="{outcome}"}} {count}')
+            lines += [
+                '# HELP app_span_duration_seconds Duration of instrumented app spans',
+                '# TYPE app_span_duration_seconds histogram',
+            ]
+            for name, (buckets, total, count) in sorted(self._histograms.items()):
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    lines.append(f'app_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {bucket_count}')
+                lines.append(f'app_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'app_span_duration_seconds_sum{{span="{name}"}} {total:.6f}')
+                lines.append(f'app_span_duration_seconds_count{{span="{name}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = SpanMetrics()
+_recent = deque(maxlen=int(os.getenv('RENDER_TRACE_HISTORY', '50')))
+_recent_lock = threading.Lock()
+_log_lock = threading.Lock()
+# Spans recorded outside any script run (job queue workers, prefetch threads)
+_background = RenderTrace('background')
+_background_lock = threading.Lock()
+
+
+def current_trace():
+    """The trace collecting this thread's spans, or None"""
+    return getattr(_local, 'trace', None)
+
+
+def background_spans():
+    """Totals of the spans recorded outside script runs since the process started"""
+    with _background_lock:
+        return _background.summary()['spans']
+
+
+def recent_renders(limit=None):
+    """Summaries of the last finished script runs, newest first"""
+    with _recent_lock:
+        renders = list(reversed(_recent))
+    return renders[:limit] if limit else renders
+
+
+@contextmanager
+def span(name):
+    """Time a block; recorded in the current trace (or the background totals) and the process histograms"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        trace = current_trace()
+        if trace is not None:
+            trace.add(name, elapsed)
+        else:
+            with _background_lock:
+                _background.add(name, elapsed)
+        metrics.observe(name, elapsed)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace_render(label):
+    """Collect the spans of one script run.
+
+    On exit the run's summary is kept for recent_renders() and, when
+    RENDER_TRACE_LOG is set, appended to that file as a JSON line.
+    """
+    trace = RenderTrace(label)
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    except BaseException as e:
+        # st.rerun() and st.stop() end a run by raising
+        name = type(e).__name__
+        trace.outcome = {'RerunException': 'rerun', 'StopException': 'stop'}.get(name, 'error')
+        raise
+    finally:
+        _local.trace = previous
+        trace.render_seconds = time.perf_counter() - trace.started
+        metrics.observe('render', trace.render_seconds)
+        metrics.count_render(trace.outcome)
+        summary = trace.summary()
+        with _recent_lock:
+            _recent.append(summary)
+        log_path = os.getenv('RENDER_TRACE_LOG')
+        if log_path:
+            with _log_lock, open(log_path, 'a', encoding='utf-8') as log:
+                log.write(json.dumps({'render_trace': summary}, ensure_ascii=False) + '\n')
+
+
+def attach_sql_timing(engine):
+    """Add statement count and time to the trace of the thread running them"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_trace() is not None:
+            conn.info.setdefault('render_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = current_trace()
+        if trace is None or not conn.info.get('render_query_start'):
+            return
+        elapsed = time.perf_counter() - conn.info['render_query_start'].pop()
+        trace.sql_count += 1
+        trace.sql_seconds += elapsed
+        metrics.observe('sql', elapsed)
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """Serve /metrics in Prometheus format on RENDER_METRICS_PORT (once per process).
+
+    The endpoint has no authentication, so it binds to RENDER_METRICS_HOST,
+    loopback by default.
+    """
+    global _metrics_server
+    port = port or int(os.getenv('RENDER_METRICS_PORT', '0'))
+    host = host or os.getenv('RENDER_METRICS_HOST', '127.0.0.1')
+    if not port or _metrics_server is not None:
+        return
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"Não foi possível abrir a porta de métricas {port}: {str(e)}")
+            _metrics_server = False
+            return
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
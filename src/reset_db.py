@@ -1,9 +1,11 @@
-from database import Base, engine
+try:
+    from database import reset_schema
+except ImportError:
+    from src.database import reset_schema
 
 def reset_database():
     """Drop all tables and recreate them"""
-    Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
+    reset_schema()
 
 if __name__ == "__main__":
     reset_database()
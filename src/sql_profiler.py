@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames from these modules are skipped when looking for the statement's call site
+_SKIPPED_FRAMES = (
+    os.path.dirname(os.path.abspath(event.__file__)).rsplit(os.sep, 1)[0] + os.sep,
+    os.path.abspath(__file__),
+    os.path.abspath(contextmanager.__code__.co_filename),
+)
+
+_local = threading.local()
+# Execution option carrying a slot that links an ORM select to its own record
+_ROWS_OPTION = 'sql_profile_rows'
+
+
+def _call_site():
+    """Return "file:line function" of the innermost caller outside SQLAlchemy issuing the query"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(_SKIPPED_FRAMES):
+            if filename.startswith(_PROJECT_ROOT + os.sep):
+                filename = os.path.relpath(filename, _PROJECT_ROOT)
+            return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+
+class QueryProfile:
+    """Statements issued during one script run, with timing, rows and call sites.
+
+    Only statement text is kept; bound parameters (patient data) are never recorded.
+    """
+
+    def __init__(self, label, n_plus_one_threshold=5):
+        self.label = label
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.started = time.perf_counter()
+        self.finished = None
+        self.records = []
+
+    def record(self, statement, elapsed, rows, call_site):
+        record = {'sql': statement, 'ms': elapsed * 1000, 'rows': rows, 'call_site': call_site}
+        self.records.append(record)
+        return record
+
+    def summary(self, top=20):
+        """Aggregate per statement and flag statements repeated from one call site (N+1)"""
+        statements = {}
+        per_site = {}
+        for record in self.records:
+            entry = statements.setdefault(record['sql'], {
+                'sql': record['sql'][:300], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'call_sites': set()
+            })
+            entry['count'] += 1
+            entry['total_ms'] += record['ms']
+            entry['max_ms'] = max(entry['max_ms'], record['ms'])
+            entry['rows'] += max(record['rows'] or 0, 0)
+            entry['call_sites'].add(record['call_site'])
+            site_key = (record['sql'], record['call_site'])
+            per_site[site_key] = per_site.get(site_key, 0) + 1
+
+        ranked = sorted(statements.values(), key=lambda entry: entry['total_ms'], reverse=True)
+        for entry in ranked:
+            entry['total_ms'] = round(entry['total_ms'], 2)
+            entry['max_ms'] = round(entry['max_ms'], 2)
+            entry['call_sites'] = sorted(entry['call_sites'])
+        n_plus_one = [
+            {'sql': sql[:300], 'call_site': call_site, 'count': count}
+            for (sql, call_site), count in per_site.items()
+            if count >= self.n_plus_one_threshold
+        ]
+        end = self.finished or time.perf_counter()
+        return {
+            'label': self.label,
+            'render_ms': round((end - self.started) * 1000, 2),
+            'queries': len(self.records),
+            'sql_ms': round(sum(record['ms'] for record in self.records), 2),
+            'rows': sum(max(record['rows'] or 0, 0) for record in self.records),
+            'n_plus_one': sorted(n_plus_one, key=lambda flag: flag['count'], reverse=True),
+            'statements': ranked[:top],
+        }
+
+
+def current_profile():
+    """The profile collecting this thread's statements, or None"""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profile_queries(label, slow_ms=None, n_plus_one_threshold=None):
+    """Collect the statements this thread runs inside the block.
+
+    On exit a JSON log line is printed when the block took longer than
+    `slow_ms` (SQL_PROFILE_SLOW_MS) or an N+1 pattern was detected.
+    """
+    slow_ms = slow_ms if slow_ms is not None else float(os.getenv('SQL_PROFILE_SLOW_MS', '500'))
+    threshold = n_plus_one_threshold or int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+    profile = QueryProfile(label, threshold)
+    previous = current_profile()
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        profile.finished = time.perf_counter()
+        summary = profile.summary()
+        if summary['render_ms'] >= slow_ms or summary['n_plus_one']:
+            print(json.dumps({'sql_profile': summary}, ensure_ascii=False))
+
+
+def attach_query_profiler(engine):
+    """Record timing, row counts and call sites of every statement run under profile_queries"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile() is not None:
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile()
+        if profile is None or not conn.info.get('query_start'):
+            return
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        # DBAPIs report -1 for SELECTs they have not fetched; ORM selects are counted below
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        record = profile.record(statement, elapsed, rows, _call_site())
+        slot = context.execution_options.get(_ROWS_OPTION) if context is not None else None
+        if slot is not None and 'record' not in slot:
+            slot['record'] = record
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _count_orm_rows(orm_execute_state):
+    """Count rows returned by ORM selects (including lazy loads) while profiling.
+
+    The statement is tagged with an execution option so the count goes to the
+    record of that statement, not to an autoflush or eager load run around it.
+    If the statement can't be matched, its row count stays unknown.
+    """
+    profile = current_profile()
+    if profile is None or not orm_execute_state.is_select:
+        return None
+    slot = {}
+    frozen = orm_execute_state.invoke_statement(execution_options={_ROWS_OPTION: slot}).freeze()
+    if 'record' in slot:
+        slot['record']['rows'] = len(frozen.data)
+    return frozen()
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / 'data' / 'cache' / 'summaries.db'
+
+
+def make_cache_key(text, model, prompt_template):
+    """Content-addressed key for a transcript/model/prompt combination"""
+    digest = hashlib.sha256()
+    for part in (model, prompt_template, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """Persistent SQLite cache of parsed summaries with LRU eviction and TTL"""
+
+    def __init__(self, path=None, max_entries=None, ttl=None):
+        self.path = Path(path or os.getenv('SUMMARY_CACHE_PATH', DEFAULT_CACHE_PATH))
+        self.max_entries = max_entries or int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '10000'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('SUMMARY_CACHE_TTL', str(30 * 24 * 3600)))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_summaries_accessed ON summaries (accessed_at)')
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached summary dict, or None on miss/expiry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT summary, created_at FROM summaries WHERE key = ?', (key,)
+            ).fetchone()
+            if row and (not self.ttl or now - row[1] <= self.ttl):
+                self._conn.execute('UPDATE summaries SET accessed_at = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                self._conn.execute('DELETE FROM summaries WHERE key = ?', (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def set(self, key, summary):
+        """Store a summary and evict least recently used entries over the limit"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, summary, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(summary, ensure_ascii=False), now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM summaries WHERE key IN (
+                    SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM summaries')
+            self._conn.commit()
+
+    def get_stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    """Return the process-wide summary cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SummaryCache()
+    return _cache
@@ -5,6 +5,10 @@ import os
 # Initialize session state variables first
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
+if 'username' not in st.session_state:
+    st.session_state['username'] = ''
+if 'is_admin' not in st.session_state:
+    st.session_state['is_admin'] = False
 if 'recording' not in st.session_state:
     st.session_state['recording'] = False
 if 'recorder' not in st.session_state:
@@ -15,6 +19,16 @@ if 'chat_messages' not in st.session_state:
     st.session_state['chat_messages'] = []
 if 'delete_confirmation' not in st.session_state:
     st.session_state['delete_confirmation'] = None
+if 'exam_download' not in st.session_state:
+    st.session_state['exam_download'] = None
+if 'consultation_download' not in st.session_state:
+    st.session_state['consultation_download'] = None
+if 'history_pages' not in st.session_state:
+    st.session_state['history_pages'] = None
+if 'exam_pages' not in st.session_state:
+    st.session_state['exam_pages'] = None
+if 'prefetched' not in st.session_state:
+    st.session_state['prefetched'] = None
 if 'view' not in st.session_state:
     st.session_state['view'] = 'search'
 if 'search_cpf' not in st.session_state:
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(__file__), '..', 'streamlit_app.py')
+PANEL = 'Desempenho'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv('JOB_QUEUE_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setenv('ADMIN_USERS', 'admin')
+    monkeypatch.setenv('ADMIN_PASSWORD', 'segredo')
+    monkeypatch.setenv('RENDER_METRICS_PORT', '0')
+    return AppTest.from_file(APP, default_timeout=60).run()
+
+
+def log_in(app, username, password):
+    app.text_input[0].input(username)
+    app.text_input[1].input(password)
+    app.button[0].click().run()
+    return app
+
+
+def has_panel(app):
+    return any(PANEL in expander.label for expander in app.sidebar.expander)
+
+
+def test_failed_login_never_shows_panel(app):
+    log_in(app, 'admin', '')
+    assert not app.session_state['logged_in']
+    assert not has_panel(app)
+
+
+def test_admin_name_with_wrong_password_is_not_admin(app):
+    log_in(app, 'admin', 'qualquer')
+    assert app.session_state['logged_in']
+    assert not has_panel(app)
+
+
+def test_admin_credentials_show_panel(app):
+    log_in(app, 'admin', 'segredo')
+    assert app.session_state['logged_in']
+    assert has_panel(app)
+
+
+def test_panel_lists_spans_recorded_outside_renders(app):
+    import threading
+    from render_timing import span
+
+    def job():
+        with span('process_exam'):
+            pass
+
+    worker = threading.Thread(target=job)
+    worker.start()
+    worker.join()
+    log_in(app, 'admin', 'segredo')
+    assert any('segundo plano' in markdown.value for markdown in app.sidebar.markdown)
+    assert any('process_exam' in str(table.value) for table in app.sidebar.table)
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from blob_store import BlobStore
+
+Base = declarative_base()
+
+
+class Blob(Base):
+    __tablename__ = 'blobs'
+    sha256 = Column(String(64), primary_key=True)
+    tamanho = Column(Integer, nullable=False)
+    compressao = Column(String(10), nullable=False)
+    dados = Column(LargeBinary, nullable=False)
+    criado_em = Column(DateTime)
+
+
+class Note(Base):
+    __tablename__ = 'notes'
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64))
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BlobStore(Blob, compression='zlib')
+    with Session(make_engine(tmp_path)) as db:
+        first = store.put(db, b'exame ' * 1000)
+        second = store.put(db, b'exame ' * 1000)
+        db.commit()
+        assert first == second
+        assert db.query(Blob).count() == 1
+        assert store.read(db, first) == b'exame ' * 1000
+
+
+def test_losing_an_upload_race_reuses_the_stored_blob(tmp_path):
+    engine = make_engine(tmp_path)
+    store = BlobStore(Blob)
+    with Session(engine) as other:
+        sha256 = store.put(other, b'mesmo pdf')
+        other.commit()
+
+    # Another session stored the same file between our existence check and insert
+    store._exists = lambda db, sha256: False
+    with Session(engine) as db:
+        db.add(Note(id=1))
+        db.flush()
+        assert store.put(db, b'mesmo pdf') == sha256
+        db.add(Note(id=2, sha256=sha256))
+        db.commit()
+        assert db.query(Note).count() == 2
+        assert db.query(Blob).count() == 1
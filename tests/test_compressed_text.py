@@ -0,0 +1,62 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select, text
+
+from compressed_text import CompressedText, decode_text, is_encoded
+
+
+def make_table():
+    engine = create_engine('sqlite://')
+    table = Table('notes', MetaData(), Column('id', Integer, primary_key=True), Column('body', CompressedText('zlib', 0)))
+    table.metadata.create_all(engine)
+    return engine, table
+
+
+def raw_body(connection):
+    return connection.execute(text('SELECT body FROM notes')).scalar()
+
+
+def test_values_are_stored_encoded():
+    engine, table = make_table()
+    with engine.begin() as connection:
+        connection.execute(table.insert(), {'id': 1, 'body': 'tosse seca há três dias ' * 20})
+        assert is_encoded(raw_body(connection))
+        assert connection.execute(select(table.c.body)).scalar() == 'tosse seca há três dias ' * 20
+
+
+def test_plain_text_mode_writes_str_until_the_column_is_converted():
+    engine, table = make_table()
+    with engine.begin() as connection:
+        # Compile once first, so the switch must reach the dialect's copy of the type
+        connection.execute(table.insert(), {'id': 1, 'body': 'antes'})
+        table.c.body.type.store_plain_text()
+        connection.execute(table.update().where(table.c.id == 1), {'body': 'texto legado'})
+        assert raw_body(connection) == 'texto legado'
+        assert connection.execute(select(table.c.body)).scalar() == 'texto legado'
+
+        table.c.body.type.store_plain_text(False)
+        connection.execute(table.update().where(table.c.id == 1), {'body': 'comprimido'})
+        assert is_encoded(raw_body(connection))
+        assert decode_text(raw_body(connection)) == 'comprimido'
+
+
+def test_zstandard_is_imported_only_when_first_used():
+    import os
+    import subprocess
+    import sys
+    src = os.path.join(os.path.dirname(__file__), '..', 'src')
+    code = ("import sys, database; before = 'zstandard' in sys.modules; "
+            "from compressed_text import encode_text, decode_text; "
+            "assert decode_text(encode_text('x' * 1000, 'zstd')) == 'x' * 1000; "
+            "print(before, 'zstandard' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], env=dict(os.environ, PYTHONPATH=src),
+                            capture_output=True, text=True, timeout=120)
+    assert result.stdout.split() == ['False', 'True'], result.stderr
+
+
+def test_zstd_falls_back_to_zlib_without_zstandard(monkeypatch):
+    import compressed_text
+    from compressed_text import METHODS
+    monkeypatch.setattr(compressed_text, '_zstandard', False)
+    monkeypatch.setattr(compressed_text, '_local', type(compressed_text._local)())
+    encoded = compressed_text.encode_text('consulta ' * 200, 'zstd')
+    assert encoded[1] == METHODS['zlib']
+    assert decode_text(encoded) == 'consulta ' * 200
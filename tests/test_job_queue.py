@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import threading
+
+from job_queue import JobQueue, DONE, FAILED, RUNNING, _process_owner
+
+
+def exited_owner():
+    """Owner string of a process that has already exited"""
+    process = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                             capture_output=True, text=True, check=True)
+    return _process_owner().rsplit(':', 1)[0] + ':' + process.stdout.strip()
+
+
+def add_running_job(queue, job_id, owner):
+    queue._execute(
+        'INSERT INTO jobs (id, kind, status, created_at, started_at, owner) VALUES (?, ?, ?, 0, 0, ?)',
+        (job_id, 'exam', RUNNING, owner)
+    )
+
+
+def test_restart_fails_only_jobs_whose_owner_exited(tmp_path):
+    path = tmp_path / 'jobs.db'
+    first = JobQueue(path, max_workers=1)
+    add_running_job(first, 'orphan', exited_owner())
+    add_running_job(first, 'legacy', None)
+    # Owned by a process that is still running (this one), e.g. another replica
+    add_running_job(first, 'live', first.owner)
+
+    second = JobQueue(path, max_workers=1)
+
+    assert second.status('orphan')['status'] == FAILED
+    assert second.status('legacy')['status'] == FAILED
+    assert second.status('live')['status'] == RUNNING
+
+
+def test_jobs_record_their_owner_and_run(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db', max_workers=1)
+    finished = threading.Event()
+
+    def work(report):
+        report({'step': 1})
+        finished.set()
+        return 'ok'
+
+    job_id = queue.submit('exam', work, patient_id=7)
+    assert finished.wait(5)
+    queue._executor.shutdown(wait=True)
+    assert queue.status(job_id)['status'] == DONE
+    assert queue.result(job_id) == 'ok'
+    owner = queue._conn.execute('SELECT owner FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+    assert owner == _process_owner()
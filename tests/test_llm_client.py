@@ -0,0 +1,113 @@
+import pytest
+import requests
+
+import llm_client
+from llm_client import LLMClient
+
+
+class FakeResponse(requests.Response):
+    """Response that records whether its body was read and the connection released"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__()
+        self.status_code = status_code
+        self.headers.update(headers or {})
+        self.url = 'http://llm.test/v1/chat/completions'
+        self._content = b'{"error": "detalhe"}'
+        self.drained = False
+        self.released = False
+
+    @property
+    def content(self):
+        self.drained = True
+        return self._content
+
+    def close(self):
+        self.released = True
+
+
+class FakeSession:
+    """Stands in for requests.Session, returning (or raising) the scripted outcomes in order"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm_client.time, 'sleep', delays.append)
+    return delays
+
+
+def make_client(*outcomes, max_retries=3, backoff_max=5.0):
+    client = LLMClient(pool_size=1, max_retries=max_retries, backoff_base=0.5, backoff_max=backoff_max)
+    client.session = FakeSession(*outcomes)
+    return client
+
+
+def post(client):
+    return client.post('http://llm.test/v1/chat/completions', {}, {'model': 'x'})
+
+
+def test_retry_after_is_honored_and_capped(sleeps):
+    throttled = FakeResponse(429, {'Retry-After': '2'})
+    throttled_long = FakeResponse(429, {'Retry-After': '120'})
+    client = make_client(throttled, throttled_long, FakeResponse(200))
+
+    assert post(client).status_code == 200
+    assert sleeps == [2.0, 5.0]
+    assert client.stats.snapshot()['retries'] == 2
+
+
+def test_server_errors_are_retried_then_raised(sleeps):
+    failures = [FakeResponse(503) for _ in range(3)]
+    client = make_client(*failures, max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        post(client)
+    assert client.session.calls == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 5.0 for delay in sleeps)
+    stats = client.stats.snapshot()
+    assert (stats['calls'], stats['retries'], stats['errors']) == (1, 2, 1)
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client = make_client(FakeResponse(400), FakeResponse(200))
+
+    with pytest.raises(requests.HTTPError):
+        post(client)
+    assert client.session.calls == 1
+    assert sleeps == []
+
+
+def test_retried_error_bodies_are_drained_and_released(sleeps):
+    failures = [FakeResponse(500), FakeResponse(429, {'Retry-After': '0'})]
+    client = make_client(*failures, FakeResponse(200))
+
+    post(client)
+    assert all(response.drained and response.released for response in failures)
+
+
+def test_connection_errors_are_retried(sleeps):
+    client = make_client(requests.ConnectionError('reset'), requests.Timeout('lento'), FakeResponse(200))
+
+    assert post(client).status_code == 200
+    assert len(sleeps) == 2
+
+
+def test_connection_errors_raise_after_the_last_retry(sleeps):
+    client = make_client(*[requests.ConnectionError('reset')] * 2, max_retries=1)
+
+    with pytest.raises(requests.ConnectionError):
+        post(client)
+    assert client.stats.snapshot()['errors'] == 1
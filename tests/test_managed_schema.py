@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def run(tmp_path, code, create_schema):
+    """Run `code` in a fresh interpreter, so database.py's process-wide state starts clean"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+               DB_CREATE_SCHEMA='1' if create_schema else '0', PYTHONPATH=SRC)
+    result = subprocess.run([sys.executable, '-c', textwrap.dedent(code)],
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+CREATE = '''
+    from database import session_scope, Patient
+    with session_scope() as db:
+        db.add(Patient(nome='Maria Souza', cpf='12345678901', data_nascimento='1980-01-01',
+                       sexo='F', telefone='0'))
+        db.commit()
+'''
+
+
+def test_consultations_are_indexed_when_schema_is_managed_elsewhere(tmp_path):
+    run(tmp_path, CREATE, create_schema=True)
+    out = run(tmp_path, '''
+        import database
+        from database import session_scope, search_consultations, Consultation
+        with session_scope() as db:
+            db.add(Consultation(patient_id=1, queixa_principal='Dor de cabeça',
+                                transcricao_completa='Paciente relata palpitações há duas semanas.'))
+            db.commit()
+            # The term is only in the transcript, which the LIKE fallback cannot search
+            print(database._consultation_search_backend, len(search_consultations(db, 'palpitacoes')))
+    ''', create_schema=False)
+    assert out.split() == ['fts5', '1']
+
+
+def test_name_search_uses_existing_index_when_schema_is_managed_elsewhere(tmp_path):
+    run(tmp_path, CREATE, create_schema=True)
+    out = run(tmp_path, '''
+        import database
+        from sqlalchemy import text
+        from database import get_engine, session_scope, search_patients
+        # A row written by another tool, without the normalized name
+        with get_engine().begin() as connection:
+            connection.execute(text(
+                "INSERT INTO patients (nome, cpf, data_nascimento, sexo, telefone) "
+                "VALUES ('João Ávila', '98765432100', '1970-01-01', 'M', '0')"
+            ))
+        with session_scope() as db:
+            print(database._name_search_backend, [p.nome for p in search_patients(db, 'joao avi')])
+    ''', create_schema=False)
+    assert out.split(None, 1) == ['fts5', "['João Ávila']\n"]
@@ -0,0 +1,165 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from medical_summarizer import MedicalSummarizer, PROMPT_TEMPLATE, REDUCE_PROMPT_TEMPLATE, estimate_tokens
+
+
+class FakeSummarizer(MedicalSummarizer):
+    """Records summarize calls instead of calling the LLM.
+
+    Texts in `failing` fail; texts in `empty` get a summary with no sections
+    found, which equals the fallback summary but is not a failure.
+    """
+
+    def __init__(self, chunk_tokens):
+        super().__init__(cache=False)
+        self.chunk_tokens = chunk_tokens
+        self.calls = []
+        self.failing = set()
+        self.empty = set()
+        self._calls_lock = threading.Lock()
+
+    def summarize(self, text, on_update=None, prompt_template=PROMPT_TEMPLATE, raise_errors=False):
+        with self._calls_lock:
+            self.calls.append((text, prompt_template))
+        if text in self.failing:
+            if raise_errors:
+                raise RuntimeError('LLM indisponível')
+            return self._fallback_summary()
+        if text in self.empty:
+            return self._parse_summary('Conversa sem conteúdo clínico.')
+        reduced = prompt_template == REDUCE_PROMPT_TEMPLATE
+        summary = dict(self._fallback_summary(), queixa_principal='reduzido' if reduced else text)
+        if on_update:
+            for section, content in summary.items():
+                on_update(section, content)
+        return summary
+
+
+def segments(count, words=40):
+    return [{'timestamp': f'00:{i:02d}:00', 'texto': f'trecho {i} ' + 'palavra ' * words} for i in range(count)]
+
+
+def test_short_transcript_is_summarized_in_one_call():
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    summary = summarizer.summarize_long('paciente com tosse seca há três dias')
+    assert summary['queixa_principal'] == 'paciente com tosse seca há três dias'
+    assert summarizer.calls == [('paciente com tosse seca há três dias', PROMPT_TEMPLATE)]
+
+
+def test_long_transcript_is_split_mapped_and_reduced():
+    parts = segments(6)
+    text = ' '.join(part['texto'] for part in parts)
+    budget = estimate_tokens(parts[0]['texto']) * 2
+    summarizer = FakeSummarizer(chunk_tokens=budget)
+    assert estimate_tokens(text) > budget
+
+    summary = summarizer.summarize_long(text, segments=parts)
+
+    maps = [call for call, template in summarizer.calls if template == PROMPT_TEMPLATE]
+    reduces = [call for call, template in summarizer.calls if template == REDUCE_PROMPT_TEMPLATE]
+    assert len(maps) == 3
+    assert all(estimate_tokens(chunk) <= budget for chunk in maps)
+    # Chunks follow segment boundaries and together cover the whole transcript
+    assert sorted(maps) == sorted(' '.join(p['texto'].strip() for p in parts[i:i + 2]) for i in (0, 2, 4))
+    assert len(reduces) == 1
+    assert 'Resumo parcial 3' in reduces[0]
+    assert summary['queixa_principal'] == 'reduzido'
+
+
+def test_long_transcript_without_segments_splits_on_sentences():
+    text = ' '.join(f'Frase número {i} da consulta com bastante conteúdo clínico.' for i in range(40))
+    summarizer = FakeSummarizer(chunk_tokens=100)
+    summarizer.summarize_long(text)
+    maps = [call for call, template in summarizer.calls if template == PROMPT_TEMPLATE]
+    assert len(maps) > 1
+    assert ' '.join(maps).count('Frase número') == 40
+
+
+def test_failed_chunk_yields_fallback_instead_of_partial_summary():
+    parts = segments(4)
+    summarizer = FakeSummarizer(chunk_tokens=estimate_tokens(parts[0]['texto']))
+    summarizer.failing.add(parts[1]['texto'].strip())
+    summary = summarizer.summarize_long(' '.join(p['texto'] for p in parts), segments=parts)
+    assert summary == summarizer._fallback_summary()
+    assert not [call for call in summarizer.calls if call[1] == REDUCE_PROMPT_TEMPLATE]
+
+
+def test_chunk_without_recognized_sections_is_not_a_failure():
+    parts = segments(4)
+    summarizer = FakeSummarizer(chunk_tokens=estimate_tokens(parts[0]['texto']))
+    summarizer.empty.add(parts[1]['texto'].strip())
+    summary = summarizer.summarize_long(' '.join(p['texto'] for p in parts), segments=parts)
+    assert summary['queixa_principal'] == 'reduzido'
+
+
+def test_summarize_many_long_preserves_order_and_marks_failures():
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    summarizer.failing.add('segunda')
+    summarizer.empty.add('terceira')
+    summaries = summarizer.summarize_many_long([('primeira', None), ('segunda', None), ('terceira', None)])
+    assert summaries[0]['queixa_principal'] == 'primeira'
+    assert summaries[1] is None
+    assert summaries[2] == summarizer._fallback_summary()
+
+
+def test_parser_keeps_inline_header_content():
+    summary = MedicalSummarizer(cache=False)._parse_summary(
+        '1. **Queixa Principal:** dor de cabeça\n**Diagnóstico**: sinusite aguda\n## PRESCRIÇÕES\nDipirona 1 g'
+    )
+    assert summary['queixa_principal'] == 'dor de cabeça'
+    assert summary['diagnostico'] == 'sinusite aguda'
+    assert summary['prescricoes'] == 'Dipirona 1 g'
+
+
+def test_parser_ignores_section_names_inside_body_lines():
+    summary = MedicalSummarizer(cache=False)._parse_summary(
+        'História Atual:\nSem diagnóstico definido\nExame físico sem alterações relatadas\nDiagnóstico:\nGastrite'
+    )
+    assert summary['historia_atual'] == 'Sem diagnóstico definido Exame físico sem alterações relatadas'
+    assert summary['diagnostico'] == 'Gastrite'
+    assert summary['exame_fisico'] == ''
+
+
+class SlowClient:
+    """LLM client stub that records how many requests are in flight at once"""
+
+    pool_size = 10
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers, payload, stream=False):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(json=lambda: {'choices': [{'message': {'content': 'Queixa Principal: dor'}}]})
+
+
+def test_nested_map_reduce_shares_one_concurrency_limit():
+    client = SlowClient()
+    summarizer = MedicalSummarizer(client=client, cache=False, max_concurrency=3)
+    summarizer.chunk_tokens = 50
+    # Six long consultations, each split into several chunks mapped concurrently
+    consultations = [(' '.join(f'Consulta {n} frase {i} com conteúdo clínico.' for i in range(40)), None)
+                     for n in range(6)]
+
+    summaries = summarizer.summarize_many_long(consultations, max_concurrency=3)
+
+    assert [s['queixa_principal'] for s in summaries] == ['dor'] * 6
+    assert client.peak == 3
+
+
+def test_concurrency_never_exceeds_client_pool():
+    client = SlowClient()
+    client.pool_size = 2
+    summarizer = MedicalSummarizer(client=client, cache=False, max_concurrency=8)
+    summarizer.summarize_many([f'consulta {i}' for i in range(8)])
+    assert client.peak == 2
@@ -0,0 +1,78 @@
+import pytest
+
+from medical_summarizer import RollingSummarizer, PROMPT_TEMPLATE, REDUCE_PROMPT_TEMPLATE, estimate_tokens
+from medical_recorder import MedicalRecorder
+from test_medical_summarizer import FakeSummarizer, segments
+
+
+def test_segments_are_summarized_in_chunks_and_reduced():
+    parts = segments(5)
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    rolling = RollingSummarizer(summarizer, min_tokens=estimate_tokens(parts[0]['texto']) * 2)
+    for part in parts:
+        rolling.add_segment(part)
+    # Two chunks of two segments were submitted while "recording"; one segment is the pending delta
+    assert len(rolling.futures) == 2
+    assert rolling.pending == [parts[4]['texto'].strip()]
+
+    summary = rolling.finish()
+
+    maps = [call for call, template in summarizer.calls if template == PROMPT_TEMPLATE]
+    assert sorted(maps) == sorted([
+        ' '.join(p['texto'].strip() for p in parts[0:2]),
+        ' '.join(p['texto'].strip() for p in parts[2:4]),
+        parts[4]['texto'].strip(),
+    ])
+    assert [template for _, template in summarizer.calls].count(REDUCE_PROMPT_TEMPLATE) == 1
+    assert summary['queixa_principal'] == 'reduzido'
+
+
+def test_failed_partial_falls_back_to_full_transcript():
+    parts = segments(4)
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    summarizer.failing.add(parts[1]['texto'].strip())
+    rolling = RollingSummarizer(summarizer, min_tokens=estimate_tokens(parts[0]['texto']))
+    for part in parts:
+        rolling.add_segment(part)
+
+    summary = rolling.finish()
+
+    # No reduce over the incomplete partials: the whole transcript is summarized instead
+    full_text = ' '.join(p['texto'].strip() for p in parts)
+    assert (full_text, PROMPT_TEMPLATE) in summarizer.calls
+    assert REDUCE_PROMPT_TEMPLATE not in [template for _, template in summarizer.calls]
+    assert summary['queixa_principal'] == full_text
+
+
+def test_partial_without_recognized_sections_is_merged():
+    parts = segments(4)
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    summarizer.empty.add(parts[1]['texto'].strip())
+    rolling = RollingSummarizer(summarizer, min_tokens=estimate_tokens(parts[0]['texto']))
+    for part in parts:
+        rolling.add_segment(part)
+
+    summary = rolling.finish()
+
+    full_text = ' '.join(p['texto'].strip() for p in parts)
+    assert (full_text, PROMPT_TEMPLATE) not in summarizer.calls
+    assert summary['queixa_principal'] == 'reduzido'
+
+
+def test_finish_resets_for_reuse():
+    summarizer = FakeSummarizer(chunk_tokens=3000)
+    rolling = RollingSummarizer(summarizer, min_tokens=1)
+    rolling.add_segment('primeira consulta')
+    assert rolling.finish()['queixa_principal'] == 'primeira consulta'
+    rolling.add_segment({'texto': 'segunda consulta'})
+    assert rolling.finish()['queixa_principal'] == 'segunda consulta'
+
+
+def test_recorder_refuses_to_save_without_segments(monkeypatch):
+    monkeypatch.delenv('DEPLOYMENT_ENV', raising=False)
+    recorder = MedicalRecorder(1, summarizer=FakeSummarizer(chunk_tokens=3000))
+    assert recorder.start_recording()
+    recorder.add_segment({'texto': '   '})
+    with pytest.raises(ValueError):
+        recorder.save_consultation()
+    assert recorder.rolling_summarizer is None
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from medical_summarizer import MedicalSummarizer
+from single_flight import SingleFlight
+
+CALLERS = 6
+
+
+class SlowSummarizer(MedicalSummarizer):
+    """_generate stays in flight until every other caller is waiting on it"""
+
+    def __init__(self, error=None):
+        super().__init__(cache=False)
+        self.single_flight = SingleFlight()
+        self.error = error
+        self.generated = 0
+
+    def _generate(self, text, cache_key, on_update, prompt_template):
+        self.generated += 1
+        deadline = time.monotonic() + 5
+        while self.single_flight.get_stats()['coalesced'] < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if self.error:
+            raise self.error
+        return dict(self._fallback_summary(), queixa_principal=f'resumo de {text}')
+
+
+def call_concurrently(fn):
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [executor.submit(fn) for _ in range(CALLERS)]
+    return futures
+
+
+def test_identical_concurrent_calls_share_one_generation():
+    summarizer = SlowSummarizer()
+    futures = call_concurrently(lambda: summarizer.summarize('tosse seca'))
+
+    summaries = [future.result() for future in futures]
+    assert summarizer.generated == 1
+    assert summaries == [dict(summarizer._fallback_summary(), queixa_principal='resumo de tosse seca')] * CALLERS
+    # Waiters get their own copy, so mutating one result does not affect the others
+    assert len({id(summary) for summary in summaries}) == CALLERS
+    assert summarizer.single_flight.get_stats() == {'calls': CALLERS, 'coalesced': CALLERS - 1, 'in_flight': 0}
+
+
+def test_waiters_receive_the_leaders_exception():
+    error = RuntimeError('LLM indisponível')
+    summarizer = SlowSummarizer(error=error)
+    futures = call_concurrently(lambda: summarizer.summarize('tosse seca', raise_errors=True))
+
+    for future in futures:
+        with pytest.raises(RuntimeError) as raised:
+            future.result()
+        assert raised.value is error
+    assert summarizer.generated == 1
+
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight()
+    runs = []
+    assert flight.do('chave', lambda: runs.append(1) or 'a') == ('a', False)
+    assert flight.do('chave', lambda: runs.append(2) or 'b') == ('b', False)
+    assert runs == [1, 2]
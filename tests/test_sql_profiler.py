@@ -0,0 +1,56 @@
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base, relationship, selectinload
+
+from sql_profiler import attach_query_profiler, profile_queries
+
+Base = declarative_base()
+
+
+class Parent(Base):
+    __tablename__ = 'parents'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    children = relationship('Child')
+
+
+class Child(Base):
+    __tablename__ = 'children'
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey('parents.id'))
+
+
+def make_session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    attach_query_profiler(engine)
+    session = Session(engine)
+    session.add_all([Parent(id=i, name=str(i), children=[Child() for _ in range(3)]) for i in (1, 2)])
+    session.commit()
+    return session
+
+
+def rows_by_table(profile, table):
+    return [record['rows'] for record in profile.records if record['sql'].startswith('SELECT') and f'FROM {table}' in record['sql']]
+
+
+def test_orm_rows_go_to_their_own_statement():
+    session = make_session()
+    with profile_queries('test', slow_ms=float('inf')) as profile:
+        parents = session.query(Parent).options(selectinload(Parent.children)).all()
+        parents[0].name = 'renamed'
+        # the pending change autoflushes an UPDATE before this select runs
+        session.query(Parent).filter(Parent.id == 1).all()
+
+    assert rows_by_table(profile, 'parents') == [2, 1]
+    assert rows_by_table(profile, 'children') == [6]
+    assert any(record['sql'].startswith('UPDATE') and record['rows'] == 1 for record in profile.records)
+
+
+def test_lazy_loads_count_their_own_rows():
+    session = make_session()
+    with profile_queries('test', slow_ms=float('inf')) as profile:
+        for parent in session.query(Parent).all():
+            len(parent.children)
+
+    assert rows_by_table(profile, 'parents') == [2]
+    assert rows_by_table(profile, 'children') == [3, 3]